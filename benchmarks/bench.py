@@ -0,0 +1,205 @@
+"""Benchmarks des étapes du rendu sur un corpus synthétique.
+
+Chaque étape est chronométrée séparément, pour chaque taille de corpus :
+
+- ``theme_extract`` : lecture des thèmes MegaPromptV3 des PNG ;
+- ``thumbnail`` : miniatures de la grille (200 px) ;
+- ``layout`` : disposition dense (en-têtes seulement) ;
+- ``dense`` / ``grid`` : ``_create_dense_collage`` / ``_create_grid_collage`` ;
+- ``post_process`` : ``post_process_collage`` par balayage des pixels ;
+- ``encode_jpeg`` / ``encode_png`` : encodage du collage dense.
+
+Usage :
+
+    python benchmarks/bench.py --sizes 10,100,1000 --output results.json
+    python benchmarks/bench.py --baseline results.json
+
+Les résultats JSON (min et médiane en secondes) peuvent servir de référence
+à une exécution ultérieure : ``--baseline`` compare les minimums et sort
+avec le code 1 si une étape a ralenti au-delà de ``--threshold`` (et de
+``NOISE_FLOOR`` en valeur absolue).
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np # type: ignore
+import PIL # type: ignore
+from PIL import Image # type: ignore
+
+from corpus import generate_corpus
+from decoding import DEFAULT_QUALITY, QUALITIES, load_resized
+from metadata_index import default_cache_dir
+from renderer import CollageRenderer
+from themes import read_png_header, theme_from_prompt
+
+STAGES = ('theme_extract', 'thumbnail', 'layout', 'dense', 'grid',
+          'post_process', 'encode_jpeg', 'encode_png')
+
+THUMB_MAX = 200
+
+# En dessous de cet écart absolu (secondes), une différence est du bruit
+NOISE_FLOOR = 0.010
+
+
+def thumbnail_size(path):
+    with Image.open(path) as img:
+        width, height = img.size
+    scale = THUMB_MAX / max(width, height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def stage_functions(paths, width, height, workers, quality=DEFAULT_QUALITY):
+    """Fonction à chronométrer pour chaque étape ; les entrées sont préparées
+    à l'avance pour ne mesurer que l'étape elle-même.
+
+    La disposition et les collages partent d'un renderer neuf à chaque
+    mesure : sinon les métadonnées mémorisées par le premier rendu
+    (``renderer.infos``) dispenseraient de lire les en-têtes.
+    """
+    def fresh_renderer():
+        return CollageRenderer(workers=workers, quality=quality)
+
+    renderer = fresh_renderer()
+    pngs = [p for p in paths if p.lower().endswith('.png')]
+    thumb_sizes = [thumbnail_size(p) for p in paths]
+    dense = renderer._create_dense_collage(paths, width, height)
+
+    def theme_extract():
+        for path in pngs:
+            theme_from_prompt(read_png_header(path)['text'].get('prompt'))
+
+    def thumbnail():
+        for path, size in zip(paths, thumb_sizes):
+            load_resized(path, size, quality=quality)
+
+    def encode(format, **options):
+        def run():
+            dense.save(io.BytesIO(), format=format, **options)
+        return run
+
+    return {
+        'theme_extract': theme_extract,
+        'thumbnail': thumbnail,
+        'layout': lambda: fresh_renderer().dense_plan(paths, width, height),
+        'dense': lambda: fresh_renderer()._create_dense_collage(paths, width, height),
+        'grid': lambda: fresh_renderer()._create_grid_collage(paths, width, height),
+        'post_process': lambda: renderer.post_process_collage(dense),
+        'encode_jpeg': encode('JPEG', quality=95, optimize=True),
+        'encode_png': encode('PNG'),
+    }
+
+
+def time_stage(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return {'min': round(min(timings), 5), 'median': round(statistics.median(timings), 5)}
+
+
+def run_benchmarks(sizes, corpus_dir, stages=STAGES, repeat=3,
+                   width=2000, height=2000, workers=None, quality=DEFAULT_QUALITY):
+    paths = generate_corpus(corpus_dir, max(sizes))
+    results = {}
+    for size in sizes:
+        functions = stage_functions(paths[:size], width, height, workers, quality)
+        results[str(size)] = {}
+        for stage in stages:
+            results[str(size)][stage] = time_stage(functions[stage], repeat)
+            print(f"{size:>6} {stage:<14} {results[str(size)][stage]['median']:.4f}s",
+                  file=sys.stderr, flush=True)
+    return {
+        'meta': {
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'pillow': PIL.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'canvas': [width, height],
+            'repeat': repeat,
+            'workers': workers,
+            'quality': quality,
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """Compare les minimums à la référence ; retourne les lignes du rapport
+    et le nombre d'étapes ayant ralenti.
+
+    Le minimum des répétitions est la mesure la moins sensible à la charge
+    de la machine ; la médiane varie trop d'une exécution à l'autre.
+    """
+    lines = []
+    regressions = 0
+    for size, stages in current['results'].items():
+        for stage, timing in stages.items():
+            reference = baseline.get('results', {}).get(size, {}).get(stage)
+            if reference is None:
+                continue
+            before, after = reference['min'], timing['min']
+            ratio = after / before if before else float('inf')
+            slower = ratio > 1 + threshold and after - before > NOISE_FLOOR
+            regressions += slower
+            lines.append(f"{size:>6} {stage:<14} {before:.4f}s -> {after:.4f}s  "
+                         f"x{ratio:.2f}{'  RALENTI' if slower else ''}")
+    return lines, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks du rendu des collages")
+    parser.add_argument('--sizes', default='10,100,1000',
+                        help="tailles de corpus, séparées par des virgules (défaut : %(default)s)")
+    parser.add_argument('--stages', default=','.join(STAGES),
+                        help="étapes à mesurer (défaut : toutes)")
+    parser.add_argument('--corpus', default=str(default_cache_dir() / 'bench-corpus'),
+                        help="dossier du corpus synthétique (défaut : %(default)s)")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=None,
+                        help="workers de décodage des tuiles")
+    parser.add_argument('--quality', choices=QUALITIES, default=DEFAULT_QUALITY,
+                        help="qualité du redimensionnement (défaut : %(default)s)")
+    parser.add_argument('--output', help="écrit les résultats JSON dans ce fichier")
+    parser.add_argument('--baseline', help="résultats JSON de référence à comparer")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="ralentissement toléré par rapport à la référence (défaut : %(default)s)")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    stages = [stage for stage in args.stages.split(',') if stage]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"étapes inconnues : {', '.join(sorted(unknown))}")
+
+    results = run_benchmarks(sizes, args.corpus, stages, args.repeat,
+                             workers=args.workers, quality=args.quality)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        lines, regressions = compare(results, baseline, args.threshold)
+        print('\n'.join(lines), file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""Vérifie que les réglages d'encodage d'un manifeste atteignent l'encodeur.
+
+Rend le même petit collage PNG trois fois : sans réglage, avec
+``"encoder": {"compress_level": 1}`` dans le job et avec
+``--png-compress-level 1``. Un niveau de compression explicite remplace
+l'optimisation par défaut (niveau 9) : le fichier doit donc être plus gros
+que celui du rendu par défaut.
+
+    python benchmarks/check_encoding.py
+
+Sort avec le code 1 si une vérification échoue.
+"""
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def render_sizes(folder):
+    """Taille du fichier écrit par chaque variante du job"""
+    import cli
+
+    base = {'inputs': ['corpus/*.*g'], 'width': 1200, 'height': 900}
+    jobs = [dict(base, id='defaut', output='defaut.png'),
+            dict(base, id='job', output='job.png', encoder={'compress_level': 1})]
+    manifest = folder / 'manifest.json'
+    manifest.write_text(json.dumps(jobs))
+    cli.main(['render', str(manifest), '--no-index', '-j', '1'])
+
+    flag = folder / 'flag.json'
+    flag.write_text(json.dumps(dict(base, id='option', output='option.png')))
+    cli.main(['render', str(flag), '--no-index', '-j', '1', '--png-compress-level', '1'])
+    return {name: (folder / f'{name}.png').stat().st_size
+            for name in ('defaut', 'job', 'option')}
+
+
+def main():
+    from corpus import generate_corpus
+
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = Path(tmp)
+        generate_corpus(folder / 'corpus', 12, max_side=512)
+        sizes = render_sizes(folder)
+
+    errors = [f"compress_level 1 ({source}) sans effet : {sizes[source]} octets, "
+              f"comme le rendu optimisé ({sizes['defaut']} octets)"
+              for source in ('job', 'option') if sizes[source] <= sizes['defaut']]
+    for error in errors:
+        print(f"ÉCHEC {error}", file=sys.stderr)
+    if not errors:
+        print("ok", file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""Vérifie le coût au démarrage du rendu sans interface.
+
+Dans un interpréteur neuf, importe le point d'entrée par lots (``cli``) et
+contrôle que :
+
+- aucun module lourd ou graphique n'est chargé à l'import (Tk, NumPy,
+  emoji, tkinterdnd2, ImageTk...) ;
+- le temps d'import reste sous le budget ;
+- un rendu complet ne charge jamais Tk.
+
+    python benchmarks/check_imports.py [--budget 0.25]
+
+Sort avec le code 1 si une vérification échoue.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# Modules qui ne doivent pas être chargés par ``import cli``
+DEFERRED = ('tkinter', 'tkinterdnd2', 'numpy', 'emoji', 'PIL.ImageTk',
+            'PIL.ImageChops', 'PIL.ImageOps', 'PIL.ImageDraw', 'PIL.ImageFont')
+
+# Modules qui ne doivent jamais être chargés par un rendu sans interface
+HEADLESS_FORBIDDEN = ('tkinter', 'tkinterdnd2', 'PIL.ImageTk')
+
+DEFAULT_BUDGET = 0.25
+
+_IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import cli
+elapsed = time.perf_counter() - start
+print(json.dumps({'seconds': elapsed, 'modules': sorted(sys.modules)}))
+"""
+
+_RENDER_PROBE = """
+import json, sys
+import cli
+cli.main(['render', sys.argv[1], '--no-index', '-j', '1'])
+print(json.dumps({'modules': sorted(sys.modules)}))
+"""
+
+
+def run_probe(code, *args):
+    """Exécute ``code`` dans un interpréteur neuf et retourne son JSON"""
+    output = subprocess.run([sys.executable, '-c', code, *args], cwd=ROOT,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def check_import(budget, repeat=3):
+    """Erreurs trouvées à l'import de ``cli`` (liste vide si tout va bien)"""
+    errors = []
+    probes = [run_probe(_IMPORT_PROBE) for _ in range(repeat)]
+    seconds = min(probe['seconds'] for probe in probes)
+    loaded = set(probes[0]['modules'])
+    for module in DEFERRED:
+        if module in loaded:
+            errors.append(f"'{module}' est importé au démarrage")
+    if seconds > budget:
+        errors.append(f"import de cli en {seconds:.3f}s (budget {budget:.3f}s)")
+    print(f"import cli : {seconds * 1000:.1f} ms", file=sys.stderr)
+    return errors
+
+
+def check_headless_render():
+    """Erreurs trouvées pendant un petit rendu par lots"""
+    from corpus import generate_corpus
+
+    with tempfile.TemporaryDirectory() as tmp:
+        generate_corpus(Path(tmp) / 'corpus', 6, max_side=256)
+        manifest = Path(tmp) / 'manifest.json'
+        manifest.write_text(json.dumps({'id': 'check', 'inputs': ['corpus/*.*g'],
+                                        'output': 'out.png', 'mode': 'grid'}))
+        loaded = set(run_probe(_RENDER_PROBE, str(manifest))['modules'])
+    return [f"'{module}' est importé par le rendu sans interface"
+            for module in HEADLESS_FORBIDDEN if module in loaded]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Vérifie le coût des imports au démarrage")
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET,
+                        help="temps d'import maximal de cli en secondes (défaut : %(default)s)")
+    args = parser.parse_args(argv)
+
+    errors = check_import(args.budget) + check_headless_render()
+    for error in errors:
+        print(f"ÉCHEC {error}", file=sys.stderr)
+    if not errors:
+        print("ok", file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""Génération d'un corpus synthétique pour les benchmarks.
+
+Le corpus mélange des formats (paysage, portrait, panoramique, carré), des
+JPEG et des PNG ; les PNG portent des métadonnées ComfyUI ``prompt`` avec un
+nœud MegaPromptV3 dont le thème commence par un emoji, comme les images
+réelles. La génération est déterministe pour une graine donnée, et un corpus
+déjà généré est réutilisé tel quel.
+
+    python benchmarks/corpus.py /tmp/corpus --count 1000
+"""
+import argparse
+import json
+import random
+from pathlib import Path
+
+import numpy as np # type: ignore
+from PIL import Image, PngImagePlugin # type: ignore
+
+# Ratios largeur / hauteur tirés au hasard
+RATIOS = (0.5, 0.5625, 0.667, 0.75, 1.0, 1.0, 1.333, 1.5, 1.778, 2.0, 3.0)
+
+THEMES = (
+    "🐉 Dragons", "🌊 Océan", "🏙️ Ville nocturne", "🌸 Printemps",
+    "🚀 Espace", "🍄 Forêt enchantée", "🤖 Robots", "🏔️ Montagnes",
+)
+
+# Part des images enregistrées en PNG (avec métadonnées)
+PNG_SHARE = 0.5
+
+MANIFEST_NAME = 'corpus.json'
+
+
+def comfyui_prompt(theme, seed):
+    """Métadonnées ``prompt`` d'un graphe ComfyUI avec un nœud MegaPromptV3"""
+    return json.dumps({
+        "3": {"class_type": "KSampler",
+              "inputs": {"seed": seed, "steps": 30, "cfg": 7.0,
+                         "sampler_name": "euler", "scheduler": "normal",
+                         "model": ["4", 0], "positive": ["207", 0]}},
+        "4": {"class_type": "CheckpointLoaderSimple",
+              "inputs": {"ckpt_name": "sdxl_base_1.0.safetensors"}},
+        "207": {"class_type": "MegaPromptV3",
+                "inputs": {"theme": theme, "style": "cinematic",
+                           "details": "highly detailed, volumetric light"}},
+    })
+
+
+def synthetic_image(rng, size):
+    """Image lisse et colorée : bruit basse résolution agrandi"""
+    grid = rng.integers(0, 256, size=(6, 6, 3), dtype=np.uint8)
+    return Image.fromarray(grid, 'RGB').resize(size, Image.Resampling.BILINEAR)
+
+
+def generate_corpus(directory, count, seed=0, min_side=256, max_side=1024):
+    """Crée ``count`` images dans ``directory`` et retourne leurs chemins.
+
+    Si le dossier contient déjà un corpus au moins aussi grand généré avec
+    les mêmes paramètres, ses premières images sont réutilisées : la
+    génération étant séquentielle, elles sont identiques.
+    """
+    directory = Path(directory)
+    params = {'seed': seed, 'min_side': min_side, 'max_side': max_side}
+    manifest = directory / MANIFEST_NAME
+    if manifest.exists():
+        data = json.loads(manifest.read_text(encoding='utf-8'))
+        paths = [directory / name for name in data.get('files', [])[:count]]
+        if data.get('params') == params and len(paths) == count and all(p.exists() for p in paths):
+            return [str(p) for p in paths]
+
+    directory.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    choice = random.Random(seed)
+    names = []
+    for i in range(count):
+        ratio = choice.choice(RATIOS)
+        long_side = choice.randint(min_side, max_side)
+        if ratio >= 1:
+            size = (long_side, max(1, round(long_side / ratio)))
+        else:
+            size = (max(1, round(long_side * ratio)), long_side)
+        img = synthetic_image(rng, size)
+
+        if choice.random() < PNG_SHARE:
+            name = f"img{i:05d}.png"
+            info = PngImagePlugin.PngInfo()
+            theme = f"{choice.choice(THEMES)} {choice.randint(1, 9)}"
+            info.add_text('prompt', comfyui_prompt(theme, i))
+            img.save(directory / name, pnginfo=info, compress_level=1)
+        else:
+            name = f"img{i:05d}.jpg"
+            img.save(directory / name, quality=90)
+        names.append(name)
+
+    manifest.write_text(json.dumps({'params': params, 'files': names}), encoding='utf-8')
+    return [str(directory / name) for name in names]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Génère un corpus d'images synthétiques")
+    parser.add_argument('directory')
+    parser.add_argument('--count', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--min-side', type=int, default=256)
+    parser.add_argument('--max-side', type=int, default=1024)
+    args = parser.parse_args(argv)
+    paths = generate_corpus(args.directory, args.count, args.seed,
+                            args.min_side, args.max_side)
+    print(f"{len(paths)} images dans {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,685 @@
+"""Point d'entrée en ligne de commande pour le rendu par lots.
+
+Usage :
+
+    python webcollage.py render manifest.jsonl [--workers N]
+
+Le manifeste est soit un fichier JSON (un objet ou une liste d'objets), soit
+un fichier JSONL (un objet par ligne). Chaque objet décrit un collage :
+
+    {"id": "nightly", "inputs": ["out/**/*.png"], "width": 4000,
+     "height": 3000, "background": "#333333", "mode": "dense",
+     "output": "sheets/nightly.jpg", "format": "JPEG"}
+
+``"format"`` (nom Pillow ou extension : ``jpg``, ``tif``) est déduit de
+``output`` s'il est absent ; il est vérifié dès le chargement du manifeste.
+
+Avec ``"stream": true``, le collage dense est écrit ligne par ligne en PNG,
+TIFF ou tampon brut (``.npy`` / ``.raw``) sans jamais allouer l'image entière,
+pour les très grands formats d'impression.
+
+``"quality"`` choisit le compromis vitesse / qualité du redimensionnement
+(``draft``, ``balanced`` ou ``final``, voir ``decoding``) ; à défaut, celui
+de l'option ``--quality``.
+
+``"encoder"`` règle l'encodage de la sortie (voir ``encoders``), par
+exemple ``{"progressive": true, "subsampling": "4:4:4"}`` en JPEG,
+``{"compress_level": 3}`` en PNG, ``{"method": 6}`` en WebP ou
+``{"speed": 8, "max_threads": 4}`` en AVIF. Les options
+``--jpeg-progressive``, ``--png-compress-level``... s'appliquent aux jobs du
+format concerné.
+
+Avec ``"group_by": "theme"``, les images sont regroupées par thème
+MegaPromptV3 et un collage est rendu par thème ; ``output`` (et ``plan``)
+contient alors ``{theme}``, remplacé par le nom du thème, par exemple
+``"sheets/{theme}.jpg"``. Les métadonnées ne sont lues qu'une fois et les
+collages des thèmes sont rendus en parallèle, comme des jobs distincts.
+
+``"max_memory": "2G"`` (ou ``--max-memory 2G``) borne la mémoire de chaque
+job : le nombre de workers de décodage et le décodage réduit sont choisis
+pour tenir dans le budget, et le job échoue avant de décoder s'il ne peut
+pas y tenir (voir ``memory``). Le pic de mémoire résidente de chaque job est
+affiché et écrit dans le rapport. Seul le processus du job est mesuré : avec
+``--tile-executor process``, la mémoire des processus de décodage n'est ni
+comptée dans le budget ni dans le pic.
+
+``"dedupe": true`` (ou ``--dedupe``) retire les quasi-doublons avant la mise
+en page : une seule image est gardée par groupe d'images dont les
+empreintes perceptuelles diffèrent d'au plus 6 bits. Seuil et empreinte se
+règlent avec ``{"threshold": 4, "hash": "phash"}`` (voir ``dedupe``).
+
+``"plan": "sheets/nightly.plan.json"`` enregistre la disposition calculée
+(``layout.LayoutPlan``) : quel fichier va où, en coordonnées normalisées.
+
+Une entrée de ``"inputs"`` peut aussi être un dossier : il est parcouru
+récursivement et les images y sont reconnues à leur signature, quelle que
+soit leur extension.
+
+Les chemins relatifs sont résolus par rapport au dossier du manifeste.
+Aucun visualiseur n'est jamais ouvert.
+
+``python webcollage.py watch dossier sortie.jpg`` surveille un dossier et
+complète un collage dense à chaque nouvelle image, en ne redessinant que
+les dernières lignes (voir ``live_collage``).
+
+``--trace summary`` affiche le temps passé dans chaque étape du rendu,
+``--trace trace.json`` l'écrit au format Chrome Trace (voir ``tracing``).
+Les messages de diagnostic passent par ``logging`` : ``-v`` pour les voir.
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from decoding import DEFAULT_QUALITY, QUALITIES
+from dedupe import DEFAULT_HASH, DEFAULT_THRESHOLD, HASH_KINDS, dedupe
+from encoders import ENCODER_KEYS, encoder_options, format_for_path
+from memory import format_size, parse_size, peak_rss, reset_peak_rss
+from metadata_index import MetadataIndex, default_index_path, probe_image
+from renderer import CollageRenderer, DEFAULT_BACKGROUND, EXECUTORS
+from scanner import scan_paths
+from striped import stripe_format_for
+from tracing import enable, enable_from_env, get_tracer, span
+from watcher import POLL_INTERVAL
+
+MODES = ('dense', 'grid')
+
+# Regroupements possibles des images d'un job (un collage par groupe)
+GROUPINGS = ('theme',)
+
+# Groupe des images sans thème MegaPromptV3
+NO_THEME = 'sans-theme'
+
+# Variable d'environnement du niveau de journalisation (DEBUG, INFO...)
+LOG_LEVEL_ENV = 'WEBCOLLAGE_LOG'
+
+# Codes de sortie
+EXIT_OK = 0
+EXIT_JOB_FAILED = 1
+EXIT_USAGE = 2
+
+
+class ManifestError(ValueError):
+    """Manifeste illisible ou job invalide"""
+
+
+def load_manifest(path):
+    """Lit un manifeste JSON ou JSONL et retourne la liste des jobs"""
+    path = Path(path)
+    text = path.read_text(encoding='utf-8')
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        # JSONL : un job par ligne non vide
+        data = []
+        for lineno, line in enumerate(text.splitlines(), 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                data.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                raise ManifestError(f"{path}:{lineno}: JSON invalide ({e})") from e
+    if isinstance(data, dict):
+        data = [data]
+    if not isinstance(data, list):
+        raise ManifestError(f"{path}: un objet ou une liste d'objets est attendu")
+
+    base_dir = path.parent
+    return [normalize_job(job, index, base_dir) for index, job in enumerate(data)]
+
+
+def normalize_job(job, index, base_dir):
+    """Valide un job et complète les valeurs par défaut"""
+    if not isinstance(job, dict):
+        raise ManifestError(f"job {index}: objet attendu")
+
+    inputs = job.get('inputs')
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    if not inputs:
+        raise ManifestError(f"job {index}: 'inputs' est requis")
+    if 'output' not in job:
+        raise ManifestError(f"job {index}: 'output' est requis")
+
+    mode = job.get('mode', 'grid' if job.get('themes') else 'dense')
+    if mode not in MODES:
+        raise ManifestError(f"job {index}: mode inconnu '{mode}' (attendu : {', '.join(MODES)})")
+
+    quality = job.get('quality')
+    if quality is not None and quality not in QUALITIES:
+        raise ManifestError(f"job {index}: qualité inconnue '{quality}' "
+                            f"(attendu : {', '.join(QUALITIES)})")
+
+    encoder = job.get('encoder', {})
+    if not isinstance(encoder, dict):
+        raise ManifestError(f"job {index}: 'encoder' doit être un objet")
+
+    group_by = job.get('group_by')
+    if group_by is not None:
+        if group_by not in GROUPINGS:
+            raise ManifestError(f"job {index}: regroupement inconnu '{group_by}' "
+                                f"(attendu : {', '.join(GROUPINGS)})")
+        if '{theme}' not in job['output']:
+            raise ManifestError(f"job {index}: 'output' doit contenir {{theme}} "
+                                f"avec \"group_by\": \"theme\"")
+
+    dedupe_options = job.get('dedupe')
+    if dedupe_options is True:
+        dedupe_options = {}
+    elif isinstance(dedupe_options, int) and not isinstance(dedupe_options, bool):
+        dedupe_options = {'threshold': dedupe_options}
+    elif dedupe_options is False:
+        dedupe_options = None
+    if dedupe_options is not None:
+        if (not isinstance(dedupe_options, dict)
+                or set(dedupe_options) - {'threshold', 'hash'}
+                or dedupe_options.get('hash', DEFAULT_HASH) not in HASH_KINDS
+                or not isinstance(dedupe_options.get('threshold', 0), int)
+                or not 0 <= dedupe_options.get('threshold', 0) <= 64):
+            raise ManifestError(f"job {index}: 'dedupe' invalide (true, un seuil de 0 à 64 "
+                                f"ou {{\"threshold\": 6, \"hash\": \"dhash\"}})")
+
+    output = str(base_dir / job['output'])
+    stream = bool(job.get('stream', False))
+    try:
+        if stream:
+            format = stripe_format_for(output, job.get('format'))
+            if format is None:
+                raise ValueError(f"écriture en bandes impossible vers {job['output']} "
+                                 f"(formats : PNG, TIFF, .npy ou .raw)")
+        else:
+            format = format_for_path(output, job.get('format'))
+    except ValueError as e:
+        raise ManifestError(f"job {index}: {e}") from e
+
+    max_memory = job.get('max_memory')
+    if max_memory is not None:
+        try:
+            max_memory = parse_size(max_memory)
+        except ValueError as e:
+            raise ManifestError(f"job {index}: 'max_memory' {e}") from e
+
+    try:
+        width = int(job.get('width', 2000))
+        height = int(job.get('height', 2000))
+    except (TypeError, ValueError) as e:
+        raise ManifestError(f"job {index}: dimensions invalides") from e
+    if width <= 0 or height <= 0:
+        raise ManifestError(f"job {index}: dimensions invalides")
+
+    return {
+        'id': str(job.get('id', index)),
+        'inputs': [str(base_dir / pattern) for pattern in inputs],
+        'width': width,
+        'height': height,
+        'background': job.get('background', DEFAULT_BACKGROUND),
+        'mode': mode,
+        'output': output,
+        'format': format,
+        'stream': stream,
+        'quality': quality,
+        'encoder': encoder,
+        'plan': str(base_dir / job['plan']) if job.get('plan') else None,
+        'group_by': group_by,
+        'max_memory': max_memory,
+        'dedupe': dedupe_options,
+    }
+
+
+def expand_inputs(patterns):
+    """Développe les motifs glob en une liste triée de fichiers, sans doublons.
+
+    Un motif qui désigne un dossier est parcouru récursivement ; seules les
+    images qui y sont reconnues à leur signature sont retenues.
+    """
+    seen = set()
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True))
+        folders = [match for match in matches if os.path.isdir(match)]
+        if folders:
+            matches = sorted(set(matches).union(scan_paths(folders)))
+        for match in matches:
+            if match not in seen and os.path.isfile(match):
+                seen.add(match)
+                paths.append(match)
+    return paths
+
+
+def theme_slug(theme):
+    """Nom de fichier tiré d'un thème (lettres accentuées conservées)"""
+    slug = re.sub(r'[^\w\-]+', '-', theme or '').strip('-_').lower()
+    return slug or NO_THEME
+
+
+def split_by_theme(job, index_path=None):
+    """Un job par thème, à partir d'une seule lecture des métadonnées.
+
+    Les métadonnées lues sont transmises aux jobs produits, qui ne relisent
+    pas les en-têtes. ``output`` et ``plan`` y remplacent ``{theme}`` par le
+    nom du thème.
+    """
+    paths = expand_inputs(job['inputs'])
+    index = MetadataIndex(index_path) if index_path else None
+    try:
+        with span('metadata', images=len(paths)):
+            if index is not None:
+                infos = index.lookup_many(paths)
+            else:
+                infos = [probe_image(path) for path in paths]
+    finally:
+        if index is not None:
+            index.close()
+
+    groups = {}
+    for info in infos:
+        if info is not None:
+            groups.setdefault(info.theme or '', []).append(info)
+
+    jobs = []
+    used = set()
+    for theme in sorted(groups):
+        slug = theme_slug(theme)
+        name, count = slug, 1
+        while name in used:
+            # Deux thèmes qui donnent le même nom de fichier
+            count += 1
+            name = f"{slug}-{count}"
+        used.add(name)
+        members = groups[theme]
+        jobs.append(dict(job,
+                         id=f"{job['id']}/{name}",
+                         theme=theme or None,
+                         output=job['output'].replace('{theme}', name),
+                         plan=job['plan'].replace('{theme}', name) if job['plan'] else None,
+                         paths=[info.path for info in members],
+                         infos=members))
+    if not jobs:
+        # Aucun groupe : le job échoue normalement, sans image
+        jobs.append(dict(job, paths=[]))
+    return jobs
+
+
+def run_job(job):
+    """Exécute un job ; ne lève jamais d'exception (le résultat porte l'erreur)"""
+    start = time.perf_counter()
+    result = {'id': job['id'], 'output': job['output'], 'images': 0}
+    # Les processus du pool enchaînent les jobs : pic mesuré job par job
+    reset_peak_rss()
+    try:
+        paths = job['paths'] if 'paths' in job else expand_inputs(job['inputs'])
+        result['images'] = len(paths)
+        if not paths:
+            raise FileNotFoundError("aucune image ne correspond aux motifs 'inputs'")
+
+        os.makedirs(os.path.dirname(os.path.abspath(job['output'])), exist_ok=True)
+        index = MetadataIndex(job['index']) if job.get('index') else None
+        try:
+            renderer = CollageRenderer(background_color=job['background'],
+                                       show_themes=job['mode'] == 'grid',
+                                       index=index,
+                                       workers=job.get('tile_workers'),
+                                       executor=job.get('tile_executor', 'thread'),
+                                       quality=job.get('quality') or DEFAULT_QUALITY,
+                                       infos={info.path: info
+                                              for info in job.get('infos', ())},
+                                       max_memory=job.get('max_memory'))
+            if job.get('dedupe') is not None:
+                settings = job['dedupe']
+                paths, duplicates = dedupe(paths,
+                                           threshold=settings.get('threshold', DEFAULT_THRESHOLD),
+                                           kind=settings.get('hash', DEFAULT_HASH),
+                                           index=index, workers=job.get('tile_workers'))
+                result['images'] = len(paths)
+                result['duplicates'] = sum(len(group) for group in duplicates.values())
+            plan = renderer.plan(paths, job['width'], job['height'])
+            if job.get('plan'):
+                plan.save(job['plan'])
+            if job['stream']:
+                writer_options = {}
+                level = job['encoder'].get('compress_level',
+                                           job.get('encoder_defaults', {}).get('compress_level'))
+                if level is not None and job['format'] == 'PNG':
+                    writer_options['compress_level'] = level
+                size = renderer.render_plan_striped(plan, job['output'], format=job['format'],
+                                                    **writer_options)
+            else:
+                format = job['format']
+                # Réglages communs de la ligne de commande (ceux de ce format),
+                # puis ceux du job ; valeurs par défaut et validation une seule
+                # fois, par ``render_plan_to_file``
+                allowed = ENCODER_KEYS.get(format, {})
+                options = {key: value
+                           for key, value in (job.get('encoder_defaults') or {}).items()
+                           if key in allowed}
+                options.update(job['encoder'])
+                size = renderer.render_plan_to_file(plan, job['output'], format=format,
+                                                    **options).size
+        finally:
+            if index is not None:
+                index.close()
+        result['size'] = list(size)
+        result['status'] = 'ok'
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = round(time.perf_counter() - start, 3)
+    result['peak_rss'] = peak_rss()
+    return result
+
+
+def run_traced_job(job):
+    """``run_job`` dans un processus du pool, avec les spans qu'il a
+    enregistrés (``result['trace']``)"""
+    tracer = enable()
+    # Événements hérités du processus principal (fork) : déjà comptés
+    tracer.collect()
+    result = run_job(job)
+    result['trace'] = tracer.collect()
+    return result
+
+
+def job_failure(job, error, seconds=0.0):
+    """Résultat d'un job qui n'a pas pu rendre le sien (processus du pool
+    tué, résultat impossible à transmettre...)"""
+    return {'id': job['id'], 'output': job['output'], 'images': 0,
+            'status': 'error', 'error': f"{type(error).__name__}: {error}",
+            'seconds': round(seconds, 3), 'peak_rss': None}
+
+
+def run_jobs(jobs, workers=None):
+    """Exécute les jobs en parallèle et produit les résultats au fil de l'eau.
+
+    Un processus du pool qui meurt (mémoire épuisée...) ne fait échouer que
+    les jobs qu'il n'a pas terminés : chacun reçoit un résultat en erreur.
+    """
+    if workers == 1 or len(jobs) <= 1:
+        for job in jobs:
+            yield run_job(job)
+        return
+    tracer = get_tracer()
+    # Les spans des workers sont rapatriés avec chaque résultat
+    work = run_job if tracer is None else run_traced_job
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(work, job): job for job in jobs}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                yield job_failure(futures[future], e, time.perf_counter() - start)
+                continue
+            if tracer is not None:
+                tracer.merge(result.pop('trace'))
+            yield result
+
+
+def format_result(result):
+    memory = ''
+    if result.get('peak_rss'):
+        memory = f"  pic {format_size(result['peak_rss'])}"
+    if result.get('duplicates'):
+        memory += f"  {result['duplicates']} doublons retirés"
+    if result['status'] == 'ok':
+        return (f"ok     {result['id']}  {result['seconds']:.2f}s{memory}  "
+                f"{result['images']} images -> {result['output']}")
+    return f"ERREUR {result['id']}  {result['seconds']:.2f}s{memory}  {result['error']}"
+
+
+def setup_logging(verbosity=0):
+    """Journalisation sur la sortie d'erreur : avertissements par défaut, plus
+    détaillée avec ``verbosity`` ou la variable ``WEBCOLLAGE_LOG``"""
+    level = os.environ.get(LOG_LEVEL_ENV, '').upper()
+    if verbosity:
+        level = 'DEBUG' if verbosity > 1 else 'INFO'
+    if not isinstance(logging.getLevelName(level), int):
+        level = 'WARNING'
+    logging.basicConfig(level=level,
+                        format='%(levelname)s %(name)s: %(message)s')
+
+
+ENCODING_OPTIONS = ('progressive', 'subsampling', 'compress_level', 'method', 'speed',
+                    'max_threads')
+
+
+def dedupe_threshold(text):
+    """Seuil de ``--dedupe`` : distance de Hamming de 0 à 64 bits"""
+    value = int(text)
+    if not 0 <= value <= 64:
+        raise argparse.ArgumentTypeError(f"{text} (attendu : 0 à 64)")
+    return value
+
+
+def thread_count(text):
+    """Nombre de threads de l'encodeur AVIF (liste de choix trop longue
+    pour ``choices``)"""
+    allowed = ENCODER_KEYS['AVIF']['max_threads']
+    value = int(text)
+    if value not in allowed:
+        raise argparse.ArgumentTypeError(
+            f"{text} (attendu : {allowed.start} à {allowed.stop - 1})")
+    return value
+
+
+def add_encoding_arguments(parser, title="encodage (jobs sans réglage 'encoder' équivalent)"):
+    encoding = parser.add_argument_group(title)
+    encoding.add_argument('--jpeg-progressive', dest='progressive', action='store_true',
+                          default=None, help="JPEG progressif")
+    encoding.add_argument('--jpeg-subsampling', dest='subsampling',
+                          choices=ENCODER_KEYS['JPEG']['subsampling'],
+                          help="sous-échantillonnage de la chrominance JPEG")
+    encoding.add_argument('--png-compress-level', dest='compress_level', type=int,
+                          choices=ENCODER_KEYS['PNG']['compress_level'], metavar='0-9',
+                          help="niveau de compression PNG (défaut : optimisation maximale)")
+    encoding.add_argument('--webp-method', dest='method', type=int,
+                          choices=ENCODER_KEYS['WEBP']['method'], metavar='0-6',
+                          help="effort de compression WebP")
+    encoding.add_argument('--avif-speed', dest='speed', type=int,
+                          choices=ENCODER_KEYS['AVIF']['speed'], metavar='0-10',
+                          help="vitesse d'encodage AVIF")
+    encoding.add_argument('--avif-threads', dest='max_threads', type=thread_count,
+                          metavar='N',
+                          help="threads de l'encodeur AVIF (défaut : un par cœur)")
+
+
+def encoding_arguments(args):
+    """Options d'encodage données en ligne de commande"""
+    return {key: getattr(args, key) for key in ENCODING_OPTIONS
+            if getattr(args, key) is not None}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='webcollage',
+                                     description="Création de collages d'images")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    render = subparsers.add_parser('render', help="rendu par lots depuis un manifeste JSON/JSONL")
+    render.add_argument('manifest', help="fichier de jobs (.json ou .jsonl)")
+    render.add_argument('-j', '--workers', type=int, default=None,
+                        help="nombre de processus (défaut : nombre de cœurs)")
+    render.add_argument('--report', help="écrit les résultats détaillés au format JSON")
+    render.add_argument('--tile-workers', type=int, default=None,
+                        help="workers de décodage par job (défaut : 1 si plusieurs jobs "
+                             "tournent en parallèle, sinon un par cœur)")
+    render.add_argument('--tile-executor', choices=EXECUTORS, default='thread',
+                        help="pool utilisé pour préparer les tuiles (défaut : %(default)s)")
+    render.add_argument('--quality', choices=QUALITIES, default=DEFAULT_QUALITY,
+                        help="qualité du redimensionnement des jobs qui ne la précisent pas "
+                             "(défaut : %(default)s)")
+    add_encoding_arguments(render)
+    render.add_argument('--max-memory', type=parse_size, default=None, metavar='TAILLE',
+                        help="budget mémoire de chaque job sans réglage 'max_memory' "
+                             "(ex. 512M, 2G) : workers et décodage réduit sont choisis "
+                             "pour le respecter ; la mémoire des processus de "
+                             "--tile-executor process n'est pas comptée")
+    render.add_argument('--dedupe', type=dedupe_threshold, nargs='?', const=DEFAULT_THRESHOLD,
+                        default=None, metavar='SEUIL',
+                        help="retire les quasi-doublons des jobs sans réglage 'dedupe' "
+                             "(distance de Hamming maximale, défaut : %(const)s)")
+    render.add_argument('--index', default=str(default_index_path()),
+                        help="index SQLite des métadonnées (défaut : %(default)s)")
+    render.add_argument('--no-index', dest='index', action='store_const', const=None,
+                        help="relit les en-têtes des images sans index persistant")
+    render.add_argument('--trace', metavar='DEST', default=None,
+                        help="mesure les étapes du rendu : 'summary' pour un tableau, "
+                             "ou fichier .json au format Chrome Trace")
+    render.add_argument('-v', '--verbose', action='count', default=0,
+                        help="messages de diagnostic (-vv pour le détail)")
+
+    watch = subparsers.add_parser('watch', help="collage dense complété à mesure que des "
+                                                "images arrivent dans un dossier")
+    watch.add_argument('folder', help="dossier surveillé (sous-dossiers compris)")
+    watch.add_argument('output', help="fichier du collage, réécrit à chaque mise à jour")
+    watch.add_argument('--width', type=int, default=2000, help="largeur (défaut : %(default)s)")
+    watch.add_argument('--height', type=int, default=2000,
+                       help="hauteur de la première mise en page ; le collage grandit "
+                            "ensuite vers le bas (défaut : %(default)s)")
+    watch.add_argument('--background', default=DEFAULT_BACKGROUND,
+                       help="couleur de fond (défaut : %(default)s)")
+    watch.add_argument('--format', default=None, help="format de sortie (défaut : extension)")
+    watch.add_argument('--plan', default=None,
+                       help="enregistre la disposition à chaque mise à jour (JSON)")
+    watch.add_argument('--interval', type=float, default=POLL_INTERVAL,
+                       help="intervalle de scrutation en secondes, sans inotify "
+                            "(défaut : %(default)s)")
+    watch.add_argument('--poll', action='store_true',
+                       help="scrute le dossier au lieu d'utiliser inotify")
+    watch.add_argument('--tile-workers', type=int, default=None,
+                       help="workers de décodage (défaut : un par cœur)")
+    watch.add_argument('--quality', choices=QUALITIES, default=DEFAULT_QUALITY,
+                       help="qualité du redimensionnement (défaut : %(default)s)")
+    add_encoding_arguments(watch, "encodage")
+    watch.add_argument('--max-memory', type=parse_size, default=None, metavar='TAILLE',
+                       help="budget mémoire (ex. 512M, 2G)")
+    watch.add_argument('--index', default=str(default_index_path()),
+                       help="index SQLite des métadonnées (défaut : %(default)s)")
+    watch.add_argument('--no-index', dest='index', action='store_const', const=None,
+                       help="relit les en-têtes des images sans index persistant")
+    watch.add_argument('--trace', metavar='DEST', default=None,
+                       help="mesure les étapes de chaque mise à jour (voir render)")
+    watch.add_argument('-v', '--verbose', action='count', default=0,
+                       help="messages de diagnostic (-vv pour le détail)")
+    return parser
+
+
+def watch_folder(args):
+    """Met le collage à jour à chaque arrivée d'images, jusqu'à Ctrl+C"""
+    from live_collage import LiveCollage
+    from watcher import DirectoryWatcher
+
+    if args.width <= 0 or args.height <= 0:
+        print("webcollage: dimensions invalides", file=sys.stderr)
+        return EXIT_USAGE
+    if not os.path.isdir(args.folder):
+        print(f"webcollage: dossier introuvable : {args.folder}", file=sys.stderr)
+        return EXIT_USAGE
+    try:
+        format = format_for_path(args.output, args.format)
+        options = encoder_options(format, encoding_arguments(args), strict=False)
+    except ValueError as e:
+        print(f"webcollage: {e}", file=sys.stderr)
+        return EXIT_USAGE
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    index = MetadataIndex(args.index) if args.index else None
+    renderer = CollageRenderer(background_color=args.background, index=index,
+                               workers=args.tile_workers, quality=args.quality,
+                               max_memory=args.max_memory)
+    collage = LiveCollage(renderer, args.width, args.height)
+
+    def update(paths):
+        start = time.perf_counter()
+        count = len(collage.entries)
+        first = collage.extend(paths)
+        added = len(collage.entries) - count
+        if not added:
+            return
+        collage.save(args.output, format, **options)
+        if args.plan:
+            collage.plan().save(args.plan)
+        print(f"+{added} images ({len(collage.entries)} au total), lignes "
+              f"{first + 1}-{len(collage.rows)} redessinées en "
+              f"{time.perf_counter() - start:.2f}s -> {args.output}", flush=True)
+
+    watcher = DirectoryWatcher(args.folder, args.interval,
+                               use_inotify=False if args.poll else None,
+                               workers=args.tile_workers)
+    try:
+        with watcher:
+            print(f"Surveillance de {args.folder} ({watcher.mode}), Ctrl+C pour arrêter",
+                  file=sys.stderr)
+            update(watcher.initial())
+            while True:
+                paths = watcher.changes(timeout=args.interval)
+                if paths:
+                    update(paths)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if index is not None:
+            index.close()
+    return EXIT_OK
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    setup_logging(args.verbose)
+    enable_from_env(args.trace)
+    if args.command == 'watch':
+        return watch_folder(args)
+
+    try:
+        jobs = load_manifest(args.manifest)
+    except (OSError, ManifestError) as e:
+        print(f"webcollage: {e}", file=sys.stderr)
+        return EXIT_USAGE
+
+    # Regroupement par thème : une seule lecture des métadonnées par job,
+    # puis un job par thème, rendus en parallèle comme les autres
+    jobs = [split for job in jobs
+            for split in (split_by_theme(job, args.index) if job['group_by'] else [job])]
+
+    tile_workers = args.tile_workers
+    if tile_workers is None and len(jobs) > 1 and args.workers != 1:
+        # Les jobs occupent déjà tous les cœurs
+        tile_workers = 1
+
+    encoder_defaults = encoding_arguments(args)
+
+    for job in jobs:
+        job['index'] = args.index
+        job['tile_workers'] = tile_workers
+        job['tile_executor'] = args.tile_executor
+        job['quality'] = job['quality'] or args.quality
+        job['encoder_defaults'] = encoder_defaults
+        job['max_memory'] = job['max_memory'] or args.max_memory
+        if job['dedupe'] is None and args.dedupe is not None:
+            job['dedupe'] = {'threshold': args.dedupe}
+
+    start = time.perf_counter()
+    results = []
+    for result in run_jobs(jobs, args.workers):
+        results.append(result)
+        print(format_result(result), flush=True)
+
+    failed = sum(1 for r in results if r['status'] != 'ok')
+    elapsed = time.perf_counter() - start
+    print(f"{len(results) - failed}/{len(results)} jobs réussis en {elapsed:.2f}s",
+          file=sys.stderr)
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump({'seconds': round(elapsed, 3), 'jobs': results}, f, indent=2)
+
+    return EXIT_JOB_FAILED if failed else EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
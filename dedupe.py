@@ -0,0 +1,262 @@
+"""Élimination des quasi-doublons avant la mise en page.
+
+Les balayages de graines produisent des séries d'images presque
+identiques. Chaque image reçoit une empreinte perceptuelle de 64 bits,
+calculée sur un décodage minuscule (``decoding``, niveau ``draft``) :
+
+- ``dhash`` : signe du gradient horizontal d'une vignette 9 × 8 en gris ;
+- ``phash`` : signe, par rapport à la médiane, des 8 × 8 basses fréquences
+  de la DCT d'une vignette 32 × 32.
+
+Les empreintes sont mémorisées dans l'index des métadonnées. Deux images
+sont voisines si leurs empreintes diffèrent d'au plus ``threshold`` bits ;
+chaque groupe de voisines (composante connexe) ne garde que sa première
+image. La comparaison se fait avec NumPy sur des ``uint64`` (XOR puis
+``popcount``). Les paires candidates sont trouvées par découpage en
+``threshold + 1`` bandes de bits : deux empreintes à distance au plus
+``threshold`` ont au moins une bande identique (principe des tiroirs), ce
+qui évite de comparer toutes les paires.
+"""
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from decoding import load_resized
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+HASH_KINDS = ('dhash', 'phash')
+DEFAULT_HASH = 'dhash'
+
+# Distance de Hamming maximale (sur 64 bits) entre deux quasi-doublons
+DEFAULT_THRESHOLD = 6
+
+# Au-delà, les bandes sont trop courtes pour filtrer : comparaison par blocs
+BAND_MAX_THRESHOLD = 10
+
+# Paires candidates vérifiées à la fois lors du découpage en bandes
+CANDIDATES_PER_BATCH = 1 << 20
+
+# Lignes comparées à la fois par la comparaison par blocs
+BLOCK_ROWS = 128
+
+
+@lru_cache(maxsize=1)
+def _popcount_table():
+    import numpy as np # type: ignore
+
+    return np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+
+
+def popcount(values, out=None):
+    """Nombre de bits à 1 de chaque ``uint64`` de ``values``.
+
+    ``np.bitwise_count`` n'existe qu'à partir de NumPy 2.0 ; avant, les
+    octets de chaque valeur passent par une table de 256 entrées.
+    """
+    import numpy as np # type: ignore
+
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values, out=out)
+    octets = np.ascontiguousarray(values).view(np.uint8).reshape(values.shape + (8,))
+    return _popcount_table()[octets].sum(axis=-1, dtype=np.uint8, out=out)
+
+
+def _bits_to_int(bits) -> int:
+    import numpy as np # type: ignore
+
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), 'big')
+
+
+def dhash(path) -> int:
+    """Empreinte par différence : un bit par paire de pixels voisins"""
+    import numpy as np # type: ignore
+
+    pixels = np.asarray(load_resized(path, (9, 8), mode='L', quality='draft'), dtype=np.int16)
+    return _bits_to_int(pixels[:, 1:] > pixels[:, :-1])
+
+
+@lru_cache(maxsize=1)
+def _dct_matrix(size=32):
+    import numpy as np # type: ignore
+
+    k = np.arange(size)[:, None]
+    n = np.arange(size)[None, :]
+    matrix = np.cos(np.pi * (2 * n + 1) * k / (2 * size)) * np.sqrt(2 / size)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+def phash(path) -> int:
+    """Empreinte DCT : basses fréquences comparées à leur médiane"""
+    import numpy as np # type: ignore
+
+    pixels = np.asarray(load_resized(path, (32, 32), mode='L', quality='draft'), dtype=np.float64)
+    dct = _dct_matrix()
+    low = (dct @ pixels @ dct.T)[:8, :8]
+    # La composante continue (luminosité moyenne) n'entre pas dans la médiane
+    return _bits_to_int(low > np.median(low.ravel()[1:]))
+
+
+HASH_FUNCTIONS = {'dhash': dhash, 'phash': phash}
+
+
+def compute_hashes(paths, kind=DEFAULT_HASH, workers: Optional[int] = None) -> List[Optional[int]]:
+    """Empreintes de ``paths`` calculées en parallèle (None si illisible)"""
+    function = HASH_FUNCTIONS[kind]
+
+    def safe_hash(path):
+        try:
+            return function(path)
+        except Exception as e:
+            logger.warning("Empreinte impossible pour %s: %s", path, e)
+            return None
+
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(paths) <= 1:
+        return [safe_hash(path) for path in paths]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='hash') as pool:
+        return list(pool.map(safe_hash, paths, chunksize=32))
+
+
+def image_hashes(paths, kind=DEFAULT_HASH, index=None,
+                 workers: Optional[int] = None) -> List[Optional[int]]:
+    """Empreintes de ``paths``, lues dans ``index`` (``MetadataIndex``) quand
+    elles y sont à jour"""
+    with span('hash', images=len(paths)):
+        if index is None:
+            return compute_hashes(paths, kind, workers)
+        return index.lookup_hashes(paths, kind,
+                                   lambda missing: compute_hashes(missing, kind, workers))
+
+
+def _band_pairs(hashes, threshold):
+    """Paires ``(i, j)``, i < j, à distance au plus ``threshold`` parmi celles
+    qui partagent une bande de bits (une paire peut apparaître plusieurs fois)"""
+    import numpy as np # type: ignore
+
+    bands = threshold + 1
+    edges = [64 * band // bands for band in range(bands + 1)]
+    firsts, seconds = [], []
+    for low, high in zip(edges, edges[1:]):
+        key = (hashes >> np.uint64(low)) & np.uint64((1 << (high - low)) - 1)
+        order = np.argsort(key, kind='stable')
+        sorted_keys = key[order]
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        sizes = np.diff(np.r_[starts, len(order)])
+        # Les seaux de même taille sont traités ensemble, par lots de paires
+        # bornés pour que la mémoire ne dépende pas du nombre d'images
+        for size in np.unique(sizes[sizes > 1]):
+            left, right = np.triu_indices(size, 1)
+            buckets = starts[sizes == size]
+            step = max(1, CANDIDATES_PER_BATCH // len(left))
+            for batch in range(0, len(buckets), step):
+                members = order[buckets[batch:batch + step, None] + np.arange(size)]
+                first, second = members[:, left].ravel(), members[:, right].ravel()
+                near = popcount(hashes[first] ^ hashes[second]) <= threshold
+                firsts.append(np.minimum(first[near], second[near]))
+                seconds.append(np.maximum(first[near], second[near]))
+    if not firsts:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    return np.concatenate(firsts), np.concatenate(seconds)
+
+
+def _block_pairs(hashes, threshold):
+    """Toutes les paires ``(i, j)``, i < j, comparées par blocs de lignes"""
+    import numpy as np # type: ignore
+
+    count = len(hashes)
+    # Tampons réutilisés d'un bloc à l'autre
+    xor = np.empty((BLOCK_ROWS, count), dtype=np.uint64)
+    distances = np.empty((BLOCK_ROWS, count), dtype=np.uint8)
+    firsts, seconds = [], []
+    for start in range(0, count, BLOCK_ROWS):
+        rows = min(BLOCK_ROWS, count - start)
+        # Seules les colonnes à partir de ``start`` (triangle supérieur)
+        block_xor = xor[:rows, :count - start]
+        block_distances = distances[:rows, :count - start]
+        np.bitwise_xor(hashes[start:start + rows, None], hashes[None, start:], out=block_xor)
+        popcount(block_xor, out=block_distances)
+        first, second = np.nonzero(block_distances <= threshold)
+        keep = second > first
+        firsts.append(first[keep] + start)
+        seconds.append(second[keep] + start)
+    return np.concatenate(firsts), np.concatenate(seconds)
+
+
+def near_duplicate_pairs(hashes, threshold=DEFAULT_THRESHOLD):
+    """Paires ``(i, j)`` d'empreintes ``uint64`` à distance au plus ``threshold``"""
+    import numpy as np # type: ignore
+
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    if len(hashes) < 2:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    if threshold > BAND_MAX_THRESHOLD:
+        return _block_pairs(hashes, threshold)
+
+    # Empreintes identiques regroupées d'abord : un grand seau de copies
+    # exactes ne produit pas de paires en nombre quadratique
+    unique, first_index, inverse = np.unique(hashes, return_index=True, return_inverse=True)
+    first, second = _band_pairs(unique, threshold)
+    first, second = first_index[first], first_index[second]
+    exact = np.flatnonzero(first_index[inverse] != np.arange(len(hashes)))
+    return (np.concatenate([first, first_index[inverse[exact]]]),
+            np.concatenate([second, exact]))
+
+
+def cluster_labels(count, first, second):
+    """Composante connexe de chaque élément : indice de son plus petit membre"""
+    parent = list(range(count))
+
+    def find(item):
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    for a, b in zip(first.tolist(), second.tolist()):
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            # La racine reste le plus petit indice : le premier arrivé
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+    return [find(item) for item in range(count)]
+
+
+def dedupe(paths, threshold=DEFAULT_THRESHOLD, kind=DEFAULT_HASH, index=None,
+           workers: Optional[int] = None) -> Tuple[List[str], Dict[str, List[str]]]:
+    """Retire les quasi-doublons de ``paths`` en gardant l'ordre.
+
+    Retourne les chemins gardés (le premier de chaque groupe, et les images
+    sans empreinte) et, pour chaque chemin gardé qui avait des doublons, la
+    liste des chemins retirés.
+    """
+    import numpy as np # type: ignore
+
+    if kind not in HASH_FUNCTIONS:
+        raise ValueError(f"empreinte inconnue : {kind} (attendu : {', '.join(HASH_KINDS)})")
+    paths = list(paths)
+    hashes = image_hashes(paths, kind, index, workers)
+    hashed = [position for position, value in enumerate(hashes) if value is not None]
+
+    with span('dedupe', images=len(hashed)):
+        values = np.array([hashes[position] for position in hashed], dtype=np.uint64)
+        first, second = near_duplicate_pairs(values, threshold)
+        labels = cluster_labels(len(hashed), first, second)
+
+    representative = {}
+    duplicates: Dict[str, List[str]] = {}
+    for local, label in enumerate(labels):
+        if label != local:
+            keeper = paths[hashed[label]]
+            duplicates.setdefault(keeper, []).append(paths[hashed[local]])
+            representative[hashed[local]] = keeper
+    kept = [path for position, path in enumerate(paths) if position not in representative]
+    if duplicates:
+        logger.info("%d quasi-doublons retirés (%d groupes)",
+                    len(paths) - len(kept), len(duplicates))
+    return kept, duplicates
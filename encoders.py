@@ -0,0 +1,104 @@
+"""Options d'encodage des fichiers de sortie.
+
+Réglages pris en charge, par format :
+
+- JPEG : ``quality``, ``optimize``, ``progressive``, ``subsampling``
+  (``4:4:4``, ``4:2:2`` ou ``4:2:0``) ;
+- PNG : ``compress_level`` (0 à 9) ou ``optimize`` ;
+- WebP : ``quality``, ``method`` (0 à 6, effort de compression), ``lossless`` ;
+- AVIF : ``quality``, ``speed`` (0 à 10, plus rapide en montant),
+  ``max_threads`` (threads de l'encodeur, par défaut un par cœur).
+"""
+import os
+from typing import Optional
+
+from PIL import Image, features # type: ignore
+
+# Valeurs par défaut, complétées par les options demandées
+ENCODER_DEFAULTS = {
+    'JPEG': {'quality': 95, 'optimize': True},
+    'PNG': {'optimize': True},
+    'WEBP': {'quality': 95, 'method': 4},
+    'AVIF': {'quality': 95, 'speed': 6},
+}
+
+# Options acceptées pour chaque format, avec leur domaine de valeurs
+ENCODER_KEYS = {
+    'JPEG': {'quality': range(1, 101), 'optimize': bool, 'progressive': bool,
+             'subsampling': ('4:4:4', '4:2:2', '4:2:0')},
+    'PNG': {'compress_level': range(0, 10), 'optimize': bool},
+    'WEBP': {'quality': range(0, 101), 'method': range(0, 7), 'lossless': bool},
+    'AVIF': {'quality': range(0, 101), 'speed': range(0, 11), 'max_threads': range(1, 257)},
+}
+
+
+def available_formats():
+    """Formats d'enregistrement disponibles avec ce Pillow"""
+    formats = ['JPEG', 'PNG']
+    for module in ('webp', 'avif'):
+        # Le module AVIF n'existe qu'à partir de Pillow 11.2
+        if module in features.modules and features.check_module(module):
+            formats.append(module.upper())
+    return formats
+
+
+def format_for_path(path, format: Optional[str] = None) -> str:
+    """Format Pillow d'enregistrement de ``path`` (ou de ``format`` s'il est
+    donné, nom ou extension : ``jpg`` donne ``JPEG``, ``tif`` donne ``TIFF``).
+
+    Lève ``ValueError`` si Pillow ne sait pas enregistrer ce format.
+    """
+    extensions = Image.registered_extensions()
+    if format is not None:
+        found = format.upper()
+        if found not in Image.SAVE:
+            found = extensions.get('.' + format.lower().lstrip('.'), found)
+    else:
+        found = extensions.get(os.path.splitext(str(path))[1].lower())
+        if found is None:
+            raise ValueError(f"Format de sortie inconnu pour {path}")
+    if found not in Image.SAVE:
+        raise ValueError(f"Format de sortie non pris en charge : {format or path}")
+    return found
+
+
+def _check_value(format, key, value, allowed):
+    if allowed is bool:
+        if not isinstance(value, bool):
+            raise ValueError(f"{format}: '{key}' doit valoir true ou false")
+    elif value not in allowed:
+        if isinstance(allowed, range):
+            expected = f"{allowed.start} à {allowed.stop - 1}"
+        else:
+            expected = ', '.join(allowed)
+        raise ValueError(f"{format}: '{key}' invalide ({value!r}, attendu : {expected})")
+
+
+def encoder_options(format, options=None, strict=True):
+    """Arguments de ``Image.save`` pour ``format``.
+
+    Les ``options`` sont validées et complètent les valeurs par défaut. Avec
+    ``strict=False``, les options qui ne concernent pas ce format sont
+    ignorées au lieu de lever ``ValueError`` (réglages communs à plusieurs
+    jobs de formats différents). Les formats non listés reçoivent les
+    options telles quelles.
+    """
+    options = {key: value for key, value in (options or {}).items() if value is not None}
+    if format not in ENCODER_KEYS:
+        return options
+
+    allowed = ENCODER_KEYS[format]
+    result = dict(ENCODER_DEFAULTS[format])
+    for key, value in options.items():
+        if key not in allowed:
+            if strict:
+                raise ValueError(f"{format}: option d'encodage inconnue '{key}' "
+                                 f"(attendu : {', '.join(allowed)})")
+            continue
+        _check_value(format, key, value, allowed[key])
+        result[key] = value
+
+    # Un niveau de compression explicite remplace l'optimisation (niveau 9)
+    if format == 'PNG' and 'compress_level' in options and 'optimize' not in options:
+        result['optimize'] = False
+    return result
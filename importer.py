@@ -0,0 +1,90 @@
+"""Import d'images en arrière-plan, indépendant de Tk.
+
+Le travail lourd (lecture des métadonnées, création des miniatures) tourne
+sur un pool de threads. L'interface récupère les résultats terminés sans
+jamais bloquer, en les interrogeant périodiquement avec ``after()`` : seuls
+les widgets sont créés sur le thread principal.
+"""
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+
+class ImageImporter:
+    """Exécute ``work(path)`` pour chaque chemin soumis, en parallèle.
+
+    Les résultats sont rendus dans l'ordre de soumission par ``poll()``.
+    ``work`` peut consulter ``importer.cancelled`` pour s'interrompre.
+    """
+
+    def __init__(self, work: Callable, workers: Optional[int] = None):
+        self.work = work
+        self.workers = workers or min(8, os.cpu_count() or 1)
+        self.total = 0
+        self.done = 0
+        self._pending = deque()
+        self._cancel = threading.Event()
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def active(self) -> bool:
+        """Vrai tant que des résultats restent à récupérer"""
+        return bool(self._pending)
+
+    def submit(self, paths):
+        """Ajoute des chemins à importer (peut être appelé pendant un import)"""
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers,
+                                            thread_name_prefix='import')
+        self._cancel.clear()
+        for path in paths:
+            self._pending.append((path, self._pool.submit(self._run, path)))
+            self.total += 1
+
+    def _run(self, path):
+        if self._cancel.is_set():
+            return None
+        return self.work(path)
+
+    def poll(self, max_items: int = 64) -> List[Tuple[str, object, Optional[BaseException]]]:
+        """Retourne sans bloquer les résultats terminés, dans l'ordre.
+
+        Chaque élément est ``(chemin, résultat, exception)``.
+        """
+        results = []
+        while self._pending and len(results) < max_items:
+            path, future = self._pending[0]
+            if not future.done():
+                break
+            self._pending.popleft()
+            self.done += 1
+            error = future.exception()
+            results.append((path, None if error else future.result(), error))
+
+        if not self._pending:
+            # Import terminé : remettre les compteurs à zéro pour le suivant
+            self.total = self.done = 0
+        return results
+
+    def cancel(self) -> List[str]:
+        """Abandonne les chemins non encore traités et les retourne"""
+        self._cancel.set()
+        abandoned = []
+        for path, future in self._pending:
+            future.cancel()
+            abandoned.append(path)
+        self._pending.clear()
+        self.total = self.done = 0
+        return abandoned
+
+    def shutdown(self):
+        self.cancel()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
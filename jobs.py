@@ -0,0 +1,64 @@
+"""Tâche longue exécutée en arrière-plan, indépendante de Tk.
+
+Comme pour ``importer``, l'interface ne bloque jamais : elle lit
+périodiquement l'avancement et le résultat avec ``after()``. La tâche
+reçoit le ``BackgroundJob`` lui-même pour publier son avancement et savoir
+si elle a été annulée.
+"""
+import threading
+from typing import Callable, Optional
+
+
+class JobCancelled(Exception):
+    """Levée par une tâche qui s'interrompt à la demande de l'utilisateur"""
+
+
+class BackgroundJob:
+    """Exécute ``work(job)`` sur un thread dédié"""
+
+    def __init__(self, work: Callable, name: str = 'job'):
+        self.work = work
+        self.done_steps = 0
+        self.total_steps = 0
+        self.stage = ''
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.cancel_event = threading.Event()
+        self._finished = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            self.result = self.work(self)
+        except JobCancelled as e:
+            # La trace garderait en vie les frames de la tâche (générateur
+            # de tuiles et son pool de workers) : seule l'annulation compte
+            self.error = e.with_traceback(None)
+            self.error.__context__ = None
+        except BaseException as e:
+            self.error = e
+        finally:
+            self._finished.set()
+
+    @property
+    def finished(self) -> bool:
+        return self._finished.is_set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        """Demande l'arrêt ; la tâche s'interrompt à sa prochaine vérification"""
+        self.cancel_event.set()
+
+    def report(self, done, total, stage=None):
+        """Publie l'avancement (appelé depuis la tâche)"""
+        self.done_steps = done
+        self.total_steps = total
+        if stage is not None:
+            self.stage = stage
@@ -0,0 +1,202 @@
+"""Mise en page des collages.
+
+Collage dense : les images sont réparties, dans l'ordre, en lignes qui
+occupent toute la largeur ; la hauteur d'une ligne vaut
+``largeur / somme des ratios``. Le découpage est obtenu par programmation
+dynamique (partition linéaire) sur les sommes préfixes des ratios : exact
+jusqu'à ``EXACT_LAYOUT_MAX`` images, borné au-delà (voir
+``justified_layout``).
+
+``LayoutPlan`` décrit le résultat d'une mise en page (quel fichier va où),
+sérialisable en JSON et rendu à n'importe quelle échelle.
+"""
+import json
+import math
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence, Tuple
+
+# Une ligne ne peut pas être plus de ROW_HEIGHT_SPREAD fois plus haute ou plus
+# basse que la hauteur cible ; cela borne la fenêtre de recherche de la
+# programmation dynamique (une ligne d'une seule image reste toujours permise)
+ROW_HEIGHT_SPREAD = 3.0
+
+# Jusqu'à ce nombre d'images, tous les débuts de ligne sont essayés
+# (coût quadratique) et le découpage est optimal
+EXACT_LAYOUT_MAX = 1000
+
+
+def target_row_height(ratios: Sequence[float], width: float, height: float) -> float:
+    """Hauteur de ligne qui donne un collage au ratio ``width / height``.
+
+    Avec k lignes de hauteur h, chaque ligne a une somme de ratios W / h et
+    la somme totale vaut R = k * W / h ; la hauteur totale k * h vaut H
+    lorsque h = sqrt(W * H / R).
+    """
+    return math.sqrt(width * height / math.fsum(ratios))
+
+
+def justified_layout(ratios: Sequence[float], width: float, height: float,
+                     target: Optional[float] = None) -> List[Tuple[int, int]]:
+    """Découpe la suite ``ratios`` (largeur / hauteur) en lignes justifiées.
+
+    Minimise la somme des écarts relatifs au carré entre la hauteur de
+    chaque ligne et la hauteur cible, ce qui équilibre les lignes et donne un
+    collage proche du ratio ``width / height``. Une hauteur cible ``target``
+    imposée remplace celle déduite de ``height`` (suite d'un collage existant).
+
+    Jusqu'à ``EXACT_LAYOUT_MAX`` images, le minimum est exact. Au-delà,
+    seules les lignes dont la hauteur reste à ``ROW_HEIGHT_SPREAD`` près de
+    la cible (ou d'une seule image) sont envisagées : le résultat est une
+    approximation bornée, en temps quasi linéaire.
+
+    Retourne la liste des intervalles ``(début, fin)`` de chaque ligne.
+    """
+    import numpy as np # type: ignore
+
+    ratios = np.asarray(ratios, dtype=np.float64)
+    n = len(ratios)
+    if n == 0:
+        return []
+
+    if target is None:
+        target = target_row_height(ratios, width, height)
+    prefix = np.concatenate(([0.0], np.cumsum(ratios)))
+
+    # Somme de ratios admissible pour une ligne
+    min_sum = width / (target * ROW_HEIGHT_SPREAD)
+    max_sum = width * ROW_HEIGHT_SPREAD / target
+
+    cost = np.empty(n + 1)
+    cost[0] = 0.0
+    previous = np.zeros(n + 1, dtype=np.int64)
+
+    # Bornes de la fenêtre de début de ligne pour chaque fin i, calculées
+    # d'un coup sur toutes les fins
+    ends = np.arange(1, n + 1)
+    starts_lo = np.searchsorted(prefix, prefix[1:] - max_sum, side='left')
+    starts_hi = np.searchsorted(prefix, prefix[1:] - min_sum, side='right') - 1
+    starts_hi = np.minimum(starts_hi, ends - 1)
+    starts_lo = np.minimum(starts_lo, starts_hi)
+    starts_lo = np.maximum(starts_lo, 0)
+    starts_hi = np.maximum(starts_hi, starts_lo)
+
+    if n <= EXACT_LAYOUT_MAX:
+        # Fenêtre complète : toutes les lignes possibles
+        starts_lo[:] = 0
+        starts_hi = ends - 1
+
+    for i in range(1, n + 1):
+        lo = starts_lo[i - 1]
+        hi = starts_hi[i - 1]
+        starts = np.arange(lo, hi + 1)
+        if hi != i - 1:
+            # Toujours autoriser une ligne d'une seule image
+            starts = np.append(starts, i - 1)
+        row_height = width / (prefix[i] - prefix[starts])
+        deviation = (row_height - target) / target
+        candidates = cost[starts] + deviation * deviation
+        best = int(np.argmin(candidates))
+        cost[i] = candidates[best]
+        previous[i] = starts[best]
+
+    rows = []
+    end = n
+    while end > 0:
+        start = int(previous[end])
+        rows.append((start, end))
+        end = start
+    rows.reverse()
+    return rows
+
+
+PLAN_VERSION = 1
+
+
+def pixel_rect(rect, size):
+    """Rectangle normalisé ``(x, y, l, h)`` converti en pixels pour ``size``.
+
+    Les bords sont arrondis indépendamment, de sorte que des tuiles jointives
+    restent jointives à toutes les échelles.
+    """
+    x, y, w, h = rect
+    left = round(x * size[0])
+    top = round(y * size[1])
+    return left, top, round((x + w) * size[0]) - left, round((y + h) * size[1]) - top
+
+
+@dataclass
+class PlanTile:
+    path: str
+    rect: Tuple[float, float, float, float]  # x, y, largeur, hauteur normalisés
+    size: Tuple[int, int]                    # taille de rééchantillonnage à l'échelle 1
+
+
+@dataclass
+class PlanCaption:
+    text: str
+    cell: Tuple[float, float, float]  # x, y (haut du texte), largeur de la cellule, normalisés
+    font_size: float                  # taille de police rapportée à la hauteur du collage
+
+
+@dataclass
+class LayoutPlan:
+    """Disposition d'un collage, calculée une fois et rendue à toute échelle.
+
+    Les rectangles sont normalisés par rapport à ``size``, la taille du
+    canvas à l'échelle 1 ; ``requested`` garde les dimensions demandées.
+    """
+    mode: str
+    background: str
+    requested: Tuple[int, int]
+    size: Tuple[int, int]
+    tiles: List[PlanTile] = field(default_factory=list)
+    captions: List[PlanCaption] = field(default_factory=list)
+
+    def output_size(self, scale=1.0):
+        return max(1, round(self.size[0] * scale)), max(1, round(self.size[1] * scale))
+
+    def fit_scale(self, max_width, max_height):
+        """Échelle pour faire tenir le collage dans ``max_width`` × ``max_height``"""
+        return min(max_width / self.size[0], max_height / self.size[1])
+
+    def to_dict(self):
+        return {
+            'version': PLAN_VERSION,
+            'mode': self.mode,
+            'background': self.background,
+            'requested': list(self.requested),
+            'size': list(self.size),
+            'tiles': [{'path': t.path, 'rect': list(t.rect), 'size': list(t.size)}
+                      for t in self.tiles],
+            'captions': [{'text': c.text, 'cell': list(c.cell), 'font_size': c.font_size}
+                         for c in self.captions],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get('version') != PLAN_VERSION:
+            raise ValueError(f"Version de plan non prise en charge: {data.get('version')}")
+        return cls(mode=data['mode'],
+                   background=data['background'],
+                   requested=tuple(data['requested']),
+                   size=tuple(data['size']),
+                   tiles=[PlanTile(t['path'], tuple(t['rect']), tuple(t['size']))
+                          for t in data['tiles']],
+                   captions=[PlanCaption(c['text'], tuple(c['cell']), c['font_size'])
+                             for c in data.get('captions', [])])
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), **kwargs)
+
+    @classmethod
+    def from_json(cls, text):
+        return cls.from_dict(json.loads(text))
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=1)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
@@ -0,0 +1,139 @@
+"""Collage dense qui s'agrandit à mesure que des images arrivent.
+
+Contrairement à ``CollageRenderer.dense_plan``, qui trie toutes les images
+par ratio avant de les répartir, les images gardent ici leur ordre
+d'arrivée et la hauteur cible des lignes est fixée par la première mise en
+page. Une nouvelle image ne remet donc en cause que la fin du collage :
+seules les dernières lignes (``REFLOW_ROWS``) sont recalculées avec elle, et
+seules leurs bandes de pixels sont redécodées et recomposées ; le reste du
+canvas est conservé en mémoire d'une mise à jour à l'autre. Le collage
+grandit vers le bas.
+"""
+import logging
+from typing import Optional
+
+from PIL import Image # type: ignore
+
+from encoders import encoder_options, format_for_path
+from layout import LayoutPlan, PlanTile, justified_layout, target_row_height
+from renderer import save_image
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Lignes existantes recalculées avec les nouvelles images
+REFLOW_ROWS = 1
+
+
+class LiveCollage:
+    """Collage dense de largeur ``width``, mis à jour par ``extend()``.
+
+    ``height`` ne sert qu'à la première mise en page : la hauteur de ligne
+    qui donne un collage au ratio ``width / height`` est ensuite conservée.
+    """
+
+    def __init__(self, renderer, width: int, height: int):
+        self.renderer = renderer
+        self.width = width
+        self.height = height
+        self.target: Optional[float] = None
+        self.entries = []        # (chemin, ratio) dans l'ordre d'arrivée
+        self.rows = []           # (début, fin) dans ``entries``
+        self.tops = [0.0]        # haut de chaque ligne, puis bas du collage
+        self.canvas: Optional[Image.Image] = None
+        self._paths = set()
+
+    @property
+    def size(self):
+        return self.canvas.size if self.canvas is not None else (self.width, 0)
+
+    def extend(self, image_paths) -> int:
+        """Ajoute les images lisibles de ``image_paths`` et met le canvas à jour.
+
+        Retourne l'indice de la première ligne redessinée (le nombre de
+        lignes si rien n'a changé).
+        """
+        paths = [path for path in dict.fromkeys(image_paths) if path not in self._paths]
+        infos = [info for info in self.renderer.read_image_infos(paths) if info is not None]
+        if not infos:
+            return len(self.rows)
+
+        with span('layout'):
+            first = max(0, len(self.rows) - REFLOW_ROWS)
+            start = self.rows[first][0] if first < len(self.rows) else len(self.entries)
+            for info in infos:
+                self.entries.append((info.path, info.ratio))
+                self._paths.add(info.path)
+            ratios = [ratio for _, ratio in self.entries[start:]]
+            if self.target is None:
+                self.target = target_row_height(ratios, self.width, self.height)
+            tail = justified_layout(ratios, self.width, self.height, target=self.target)
+
+            del self.rows[first:], self.tops[first + 1:]
+            for begin, end in tail:
+                self.rows.append((start + begin, start + end))
+                row_ratio = sum(ratio for _, ratio in self.entries[start + begin:start + end])
+                self.tops.append(self.tops[-1] + self.width / row_ratio)
+
+        self.render_rows(first)
+        return first
+
+    def row_tiles(self, index):
+        """Tuiles ``(chemin, (x, y, l, h))`` en pixels de la ligne ``index``"""
+        begin, end = self.rows[index]
+        row_height = self.tops[index + 1] - self.tops[index]
+        top = int(self.tops[index])
+        x = 0
+        tiles = []
+        for path, ratio in self.entries[begin:end]:
+            img_width = int(row_height * ratio)
+            tiles.append((path, (x, top, img_width, int(row_height))))
+            x += img_width
+        return tiles
+
+    def render_rows(self, first):
+        """Redessine les lignes à partir de ``first`` ; le haut du canvas est
+        conservé tel quel"""
+        tiles = [tile for index in range(first, len(self.rows))
+                 for tile in self.row_tiles(index)]
+        band_top = int(self.tops[first])
+        height = max([y + h for _, (_, y, _, h) in tiles] + [band_top, 1])
+        background = self.renderer.background_color
+
+        if self.canvas is None or self.canvas.height != height:
+            canvas = Image.new('RGB', (self.width, height), background)
+            if self.canvas is not None and band_top > 0:
+                canvas.paste(self.canvas.crop((0, 0, self.width, band_top)), (0, 0))
+            self.canvas = canvas
+        else:
+            self.canvas.paste(background, (0, band_top, self.width, height))
+
+        # Ancien et nouveau canvas coexistent quand le collage grandit
+        self.renderer.fit_memory_budget([(path, (w, h)) for path, (_, _, w, h) in tiles],
+                                        2 * self.width * height * 3)
+        tasks = [self.renderer.tile_task(path, w, h) for path, (_, _, w, h) in tiles]
+        for done, ((_, (x, y, _, _)), img) in enumerate(
+                zip(tiles, self.renderer.prepare_tiles(tasks)), 1):
+            if img is not None:
+                with span('composite'):
+                    self.canvas.paste(img, (x, y))
+            self.renderer.checkpoint(done, len(tiles), 'composite')
+        logger.debug("Lignes %d à %d redessinées (%d tuiles, bande %d-%d)",
+                     first, len(self.rows) - 1, len(tiles), band_top, height)
+
+    def plan(self) -> LayoutPlan:
+        """Disposition courante, au format de ``layout``"""
+        width, height = self.size
+        plan = LayoutPlan(mode='dense', background=self.renderer.background_color,
+                          requested=(self.width, self.height), size=(width, max(1, height)))
+        for index in range(len(self.rows)):
+            for path, (x, y, w, h) in self.row_tiles(index):
+                plan.tiles.append(PlanTile(path, (x / width, y / plan.size[1],
+                                                  w / width, h / plan.size[1]), (w, h)))
+        return plan
+
+    def save(self, output_path, format: Optional[str] = None, **save_options):
+        """Écrit le canvas courant (les formats compressés sont réencodés en
+        entier ; seules les tuiles des lignes modifiées ont été recalculées)"""
+        format = format_for_path(output_path, format)
+        save_image(self.canvas, output_path, format, **encoder_options(format, save_options))
@@ -0,0 +1,181 @@
+"""Budget mémoire du rendu.
+
+Avec un budget (``--max-memory 2G``), le rendu estime avant de décoder ce
+que coûteront le canvas et les tuiles en cours de préparation, puis choisit
+le nombre de workers et la marge de décodage réduit (voir ``decoding``) qui
+tiennent dans le budget. Les tuiles redimensionnées gardées d'un rendu à
+l'autre le sont dans un ``TileCache`` plafonné en octets, et le pic de
+mémoire résidente de chaque job est mesuré.
+
+Seule la mémoire du processus courant est mesurée et bornée : les workers
+d'un pool de processus (``--tile-executor process``) n'y sont pas comptés.
+"""
+import re
+import sys
+from collections import OrderedDict
+from typing import Optional
+
+# Multiplicateurs des suffixes acceptés par ``parse_size``
+_UNITS = {'': 1, 'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30, 'T': 1 << 40}
+
+# Tuiles redimensionnées d'avance par worker (voir ``CollageRenderer.prepare_tiles``)
+TILES_AHEAD = 4
+
+# Octets par pixel d'un décodage (RGBA ou conversion en cours)
+DECODE_BYTES_PER_PIXEL = 4
+
+# Marges de décodage essayées, de la meilleure qualité à la plus économe
+FALLBACK_GAPS = (2.0, 1.0)
+
+
+class MemoryBudgetError(ValueError):
+    """Le rendu ne peut pas tenir dans le budget mémoire demandé"""
+
+
+def parse_size(text) -> int:
+    """Taille en octets de ``text`` (``512M``, ``2G``, ``1.5GiB``, ``1000000``)"""
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([KMGT]?)(?:I?B)?\s*', str(text), re.IGNORECASE)
+    if not match:
+        raise ValueError(f"taille invalide : {text!r} (exemples : 512M, 2G)")
+    return int(float(match.group(1)) * _UNITS[match.group(2).upper()])
+
+
+def format_size(size) -> str:
+    for unit in ('o', 'Ko', 'Mo', 'Go'):
+        if size < 1024 or unit == 'Go':
+            return f"{size:.0f} {unit}" if unit == 'o' else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def _status_bytes(field) -> Optional[int]:
+    """Champ de /proc/self/status en octets (Linux)"""
+    try:
+        with open('/proc/self/status', encoding='ascii') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def current_rss() -> Optional[int]:
+    """Mémoire résidente actuelle du processus (None si inconnue)"""
+    return _status_bytes('VmRSS')
+
+
+def reset_peak_rss() -> bool:
+    """Remet à zéro le pic de mémoire résidente (Linux seulement).
+
+    Les workers d'un pool de processus enchaînent plusieurs jobs : sans
+    remise à zéro, le pic d'un job inclurait celui des précédents.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss() -> Optional[int]:
+    """Pic de mémoire résidente depuis le démarrage ou ``reset_peak_rss()``"""
+    peak = _status_bytes('VmHWM')
+    if peak is not None:
+        return peak
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kio sous Linux, octets sous macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def image_bytes(img) -> int:
+    """Octets occupés par les pixels de ``img`` (0 pour None)"""
+    if img is None:
+        return 0
+    return img.width * img.height * len(img.getbands())
+
+
+def decode_bytes(info, size, gap) -> int:
+    """Estimation du pic mémoire pour décoder ``info`` vers une tuile ``size``.
+
+    Les JPEG sont décodés réduits dans la DCT (facteur 1/2 à 1/8) : au plus
+    deux fois la taille visée par dimension. Les autres formats sont décodés
+    en entier avant ``reduce()``.
+    """
+    width, height = info.width, info.height
+    if info.format == 'JPEG':
+        for _ in range(3):
+            if width // 2 < size[0] * gap or height // 2 < size[1] * gap:
+                break
+            width, height = width // 2, height // 2
+    return width * height * DECODE_BYTES_PER_PIXEL + size[0] * size[1] * 3
+
+
+def fit_budget(budget, resident, tiles, workers, gap, in_use=0):
+    """Choisit ``(workers, marge de décodage)`` pour tenir dans ``budget``.
+
+    ``in_use`` est la mémoire déjà occupée par le processus, ``resident`` la
+    mémoire fixe du rendu (canvas ou bande) et ``tiles`` la liste
+    ``(ImageInfo, taille de tuile)``. Chaque worker décode une image et
+    garde ``TILES_AHEAD`` tuiles d'avance ; on réduit d'abord le nombre de
+    workers, puis la marge de décodage. Lève ``MemoryBudgetError`` si le
+    budget est déjà dépassé ou si même un seul worker le dépasse.
+    """
+    if in_use >= budget:
+        raise MemoryBudgetError(f"budget mémoire déjà dépassé : {format_size(in_use)} "
+                                f"occupés avant le rendu pour un budget de "
+                                f"{format_size(budget)}")
+    tile_bytes = max((size[0] * size[1] * 3 for _, size in tiles), default=0)
+    needed = in_use + resident
+    for candidate in [value for value in FALLBACK_GAPS if value <= gap] or [gap]:
+        decode = max((decode_bytes(info, size, candidate) for info, size in tiles), default=0)
+        per_worker = decode + TILES_AHEAD * tile_bytes
+        available = budget - in_use - resident
+        affordable = int(available // per_worker) if per_worker else workers
+        if affordable >= 1:
+            return min(workers, affordable), candidate
+        needed = in_use + resident + per_worker
+    raise MemoryBudgetError(f"budget mémoire insuffisant : {format_size(budget)} dont "
+                            f"{format_size(in_use)} déjà occupés, environ "
+                            f"{format_size(needed)} nécessaires")
+
+
+class TileCache:
+    """Tuiles redimensionnées ``(chemin, taille, ...) -> image``, gardées en
+    mémoire dans la limite de ``max_bytes`` (les moins récemment utilisées
+    sont évincées)"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._tiles = OrderedDict()
+
+    def __len__(self):
+        return len(self._tiles)
+
+    def __contains__(self, key):
+        return key in self._tiles
+
+    def __getitem__(self, key):
+        self._tiles.move_to_end(key)
+        return self._tiles[key]
+
+    def __setitem__(self, key, img):
+        if key in self._tiles:
+            self.bytes -= image_bytes(self._tiles.pop(key))
+        size = image_bytes(img)
+        if size > self.max_bytes:
+            return
+        self._tiles[key] = img
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, evicted = self._tiles.popitem(last=False)
+            self.bytes -= image_bytes(evicted)
+
+    def clear(self):
+        self._tiles.clear()
+        self.bytes = 0
@@ -0,0 +1,273 @@
+"""Index persistant des métadonnées d'images (SQLite).
+
+Pour chaque fichier, l'index conserve les dimensions, le mode, le format,
+l'orientation EXIF et le thème MegaPromptV3 extrait. Une entrée est valide
+tant que la date de modification et la taille du fichier n'ont pas changé :
+rouvrir un dossier déjà vu ne demande alors qu'un ``stat`` par fichier, et la
+mise en page peut être calculée à partir de l'index seul.
+"""
+import logging
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from PIL import Image # type: ignore
+
+from themes import extract_theme_from_metadata, read_png_header, theme_from_prompt
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+
+# Taille des lots pour les requêtes "IN (...)" (limite de variables SQLite)
+_QUERY_CHUNK = 500
+
+# Masque des empreintes 64 bits (stockées signées par SQLite)
+_UINT64 = (1 << 64) - 1
+
+# Tag EXIF de l'orientation
+_EXIF_ORIENTATION = 0x0112
+
+
+def default_cache_dir() -> Path:
+    """Dossier de cache de l'application (XDG_CACHE_HOME sous Linux)"""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(Path.home(), '.cache')
+    return Path(base) / 'webcollage'
+
+
+def default_index_path() -> Path:
+    return default_cache_dir() / 'metadata.sqlite'
+
+
+@dataclass
+class ImageInfo:
+    path: str
+    width: int
+    height: int
+    mode: str
+    format: Optional[str]
+    orientation: int = 1
+    theme: Optional[str] = None
+
+    @property
+    def ratio(self):
+        return self.width / self.height
+
+
+def probe_image(path) -> Optional[ImageInfo]:
+    """Lit les métadonnées d'une image sans décoder ses pixels"""
+    try:
+        # PNG : lecture directe des chunks jusqu'aux pixels, sauf si une
+        # orientation EXIF est à lire
+        header = read_png_header(path)
+        if header is not None and not header['exif']:
+            width, height = header['size']
+            if width <= 0 or height <= 0:
+                return None
+            return ImageInfo(path=str(path),
+                             width=width,
+                             height=height,
+                             mode=header['mode'],
+                             format='PNG',
+                             theme=theme_from_prompt(header['text'].get('prompt')))
+
+        with Image.open(path) as img:
+            if img.width <= 0 or img.height <= 0:
+                return None
+            try:
+                orientation = int(img.getexif().get(_EXIF_ORIENTATION, 1))
+            except Exception:
+                orientation = 1
+            return ImageInfo(path=str(path),
+                             width=img.width,
+                             height=img.height,
+                             mode=img.mode,
+                             format=img.format,
+                             orientation=orientation,
+                             theme=extract_theme_from_metadata(img))
+    except Exception as e:
+        logger.warning("Erreur lors du chargement de %s: %s", path, e)
+        return None
+
+
+class MetadataIndex:
+    """Cache SQLite des métadonnées, invalidé par mtime et taille"""
+
+    def __init__(self, db_path=None):
+        if db_path is None:
+            db_path = default_index_path()
+        if str(db_path) != ':memory:':
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = str(db_path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, timeout=30,
+                                     check_same_thread=False)
+        self._setup()
+
+    def _setup(self):
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if version != SCHEMA_VERSION:
+                self._conn.execute("DROP TABLE IF EXISTS images")
+                self._conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+            # width = 0 marque un fichier illisible, pour ne pas le rouvrir
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS images (
+                    path TEXT PRIMARY KEY,
+                    mtime_ns INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    width INTEGER NOT NULL,
+                    height INTEGER NOT NULL,
+                    ratio REAL,
+                    mode TEXT,
+                    format TEXT,
+                    orientation INTEGER,
+                    theme TEXT
+                )""")
+            # Empreintes perceptuelles (voir ``dedupe``), une par type de hash
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS hashes (
+                    path TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    hash INTEGER,
+                    PRIMARY KEY (path, kind)
+                )""")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def lookup(self, path) -> Optional[ImageInfo]:
+        """Retourne les métadonnées de ``path`` (None si illisible)"""
+        return self.lookup_many([path])[0]
+
+    def lookup_many(self, paths) -> List[Optional[ImageInfo]]:
+        """Retourne les métadonnées de chaque chemin, dans l'ordre.
+
+        Les entrées absentes ou périmées sont recalculées puis enregistrées
+        dans une seule transaction.
+        """
+        keys, stats = self._stat_keys(paths)
+
+        rows = self._fetch([k for k in keys if stats[k] is not None])
+
+        results = []
+        updates = []
+        for path, key in zip(paths, keys):
+            stat = stats[key]
+            if stat is None:
+                results.append(None)
+                continue
+            row = rows.get(key)
+            if row is not None and (row[0], row[1]) == stat:
+                results.append(self._row_to_info(path, row))
+                continue
+            info = probe_image(path)
+            updates.append(self._info_to_row(key, stat, info))
+            results.append(info)
+
+        if updates:
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO images VALUES (?,?,?,?,?,?,?,?,?,?)",
+                    updates)
+        return results
+
+    def lookup_hashes(self, paths, kind, compute) -> List[Optional[int]]:
+        """Empreinte ``kind`` (entier 64 bits non signé) de chaque chemin.
+
+        Les empreintes absentes ou périmées sont calculées d'un coup par
+        ``compute(chemins)`` (None pour un fichier illisible), puis
+        enregistrées dans une seule transaction.
+        """
+        keys, stats = self._stat_keys(paths)
+
+        rows = self._fetch_rows("SELECT path, mtime_ns, size, hash FROM hashes "
+                                "WHERE kind = ? AND path IN ({})",
+                                [k for k in keys if stats[k] is not None], (kind,))
+
+        results = [None] * len(paths)
+        missing = []
+        for position, key in enumerate(keys):
+            row = rows.get(key)
+            if stats[key] is None:
+                continue
+            if row is not None and (row[0], row[1]) == stats[key]:
+                # SQLite ne stocke que des entiers signés
+                results[position] = None if row[2] is None else row[2] & _UINT64
+            else:
+                missing.append(position)
+
+        if missing:
+            computed = compute([paths[position] for position in missing])
+            updates = []
+            for position, value in zip(missing, computed):
+                results[position] = value
+                key = keys[position]
+                stored = value
+                if value is not None and value >> 63:
+                    stored = value - (1 << 64)
+                updates.append((key, kind, stats[key][0], stats[key][1], stored))
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO hashes VALUES (?,?,?,?,?)", updates)
+        return results
+
+    @staticmethod
+    def _stat_keys(paths):
+        """Chemins absolus (clés de l'index) et leur ``(mtime_ns, taille)``,
+        None pour un fichier introuvable"""
+        keys = [os.path.abspath(p) for p in paths]
+        stats = {}
+        for key in keys:
+            try:
+                st = os.stat(key)
+                stats[key] = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                stats[key] = None
+        return keys, stats
+
+    def _fetch_rows(self, query, keys, params=()) -> Dict[str, tuple]:
+        """Exécute ``query`` par lots de clés (``{}`` reçoit les ``?`` du
+        ``IN``) ; la première colonne est le chemin, les suivantes la valeur"""
+        rows = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            for i in range(0, len(unique), _QUERY_CHUNK):
+                chunk = unique[i:i + _QUERY_CHUNK]
+                placeholders = ','.join('?' * len(chunk))
+                for row in self._conn.execute(query.format(placeholders), [*params, *chunk]):
+                    rows[row[0]] = row[1:]
+        return rows
+
+    def _fetch(self, keys) -> Dict[str, tuple]:
+        return self._fetch_rows("SELECT path, mtime_ns, size, width, height, mode, format, "
+                                "orientation, theme FROM images WHERE path IN ({})", keys)
+
+    @staticmethod
+    def _row_to_info(path, row) -> Optional[ImageInfo]:
+        _, _, width, height, mode, format, orientation, theme = row
+        if width <= 0 or height <= 0:
+            return None
+        return ImageInfo(path=str(path), width=width, height=height, mode=mode,
+                         format=format, orientation=orientation or 1, theme=theme)
+
+    @staticmethod
+    def _info_to_row(key, stat, info):
+        if info is None:
+            return (key, stat[0], stat[1], 0, 0, None, None, None, None, None)
+        return (key, stat[0], stat[1], info.width, info.height, info.ratio,
+                info.mode, info.format, info.orientation, info.theme)
@@ -0,0 +1,611 @@
+"""Moteur de rendu des collages, indépendant de Tk.
+
+Utilisé à la fois par l'interface graphique (``webcollage.ModernApp``) et par
+les traitements par lots : aucune fenêtre n'est ouverte, tous les paramètres
+sont passés explicitement. NumPy et les modules de dessin de Pillow ne sont
+importés qu'à leur première utilisation.
+"""
+import logging
+import math
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+from typing import Callable, Optional
+
+from PIL import Image # type: ignore
+
+from decoding import DEFAULT_QUALITY, QUALITIES, load_resized
+from encoders import encoder_options, format_for_path
+from jobs import JobCancelled
+from layout import LayoutPlan, PlanCaption, PlanTile, justified_layout, pixel_rect
+from memory import TILES_AHEAD, current_rss, fit_budget, format_size
+from metadata_index import probe_image
+from striped import open_stripe_writer
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKGROUND = '#333333'
+
+
+EXECUTORS = ('thread', 'process')
+
+# Hauteur des bandes quand l'image complète est déjà en mémoire
+STRIPE_HEIGHT = 256
+
+# Recherche du contenu par balayage des pixels : tolérance sur chaque canal
+# et nombre de lignes analysées à la fois
+BACKGROUND_TOLERANCE = 10
+SCAN_ROWS = 512
+
+
+def load_font(size):
+    """Police des thèmes à la taille ``size``"""
+    from PIL import ImageFont # type: ignore
+
+    try:
+        return ImageFont.truetype("arial.ttf", size)
+    except:
+        try:
+            return ImageFont.load_default(size)
+        except TypeError:
+            # Pillow < 10.1 : police bitmap de taille fixe
+            return ImageFont.load_default()
+
+
+def union_bbox(a, b):
+    """Plus petit rectangle ``(gauche, haut, droite, bas)`` contenant a et b"""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])
+
+
+def content_bbox(image, bg_color, tolerance=BACKGROUND_TOLERANCE, chunk_rows=SCAN_ROWS):
+    """Rectangle des pixels qui diffèrent du fond (None si l'image est vide).
+
+    Balayage de secours quand la géométrie du collage est inconnue. L'image
+    est analysée par paquets de lignes, en int16 pour que la différence avec
+    le fond ne déborde pas.
+    """
+    import numpy as np # type: ignore
+    from PIL import ImageColor # type: ignore
+
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    width, height = image.size
+    background = np.array(ImageColor.getrgb(bg_color)[:3], dtype=np.int16)
+
+    cols = np.zeros(width, dtype=bool)
+    top = bottom = None
+    for start in range(0, height, chunk_rows):
+        chunk = np.asarray(image.crop((0, start, width, min(height, start + chunk_rows))))
+        diff = np.abs(chunk.astype(np.int16) - background)
+        mask = np.any(diff > tolerance, axis=2)
+        rows = np.flatnonzero(np.any(mask, axis=1))
+        if rows.size:
+            if top is None:
+                top = start + int(rows[0])
+            bottom = start + int(rows[-1]) + 1
+            cols |= np.any(mask, axis=0)
+
+    if top is None:
+        return None
+    found = np.flatnonzero(cols)
+    return int(found[0]), top, int(found[-1]) + 1, bottom
+
+
+def save_image(image, output_path, format, **save_options):
+    """Écrit ``image`` sous un nom temporaire puis le renomme en ``output_path``"""
+    tmp_path = f"{output_path}.{os.getpid()}.part"
+    try:
+        with span('encode', path=output_path):
+            image.save(tmp_path, format=format, **save_options)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def load_tile(task):
+    """Décode une image et la redimensionne à la taille exacte de sa tuile"""
+    path, size, quality, gap = task
+    try:
+        return load_resized(path, size, quality=quality, gap=gap)
+    except Exception as e:
+        logger.warning("Erreur lors du chargement de %s: %s", path, e)
+        return None
+
+
+class CollageRenderer:
+    def __init__(self, background_color: str = DEFAULT_BACKGROUND,
+                 show_themes: bool = False, index=None,
+                 workers: Optional[int] = None, executor: str = 'thread',
+                 quality: str = DEFAULT_QUALITY,
+                 progress: Optional[Callable] = None, cancel_event=None,
+                 infos=None, max_memory: Optional[int] = None):
+        if executor not in EXECUTORS:
+            raise ValueError(f"executor inconnu: {executor}")
+        if quality not in QUALITIES:
+            raise ValueError(f"qualité inconnue: {quality}")
+        self.background_color = background_color
+        self.show_themes = show_themes
+        # MetadataIndex optionnel : évite de rouvrir les fichiers déjà vus
+        self.index = index
+        # Préparation des tuiles : None = un worker par cœur
+        self.workers = workers
+        self.executor = executor
+        # Compromis vitesse / qualité du redimensionnement des tuiles
+        self.quality = quality
+        # Suivi d'un rendu en arrière-plan : progress(fait, total, étape) est
+        # appelé après chaque tuile ; cancel_event (threading.Event) l'interrompt
+        self.progress = progress
+        self.cancel_event = cancel_event
+        # Métadonnées déjà lues (chemin -> ImageInfo ou None), par exemple lors
+        # d'un regroupement par thème, puis complétées à chaque lecture : le
+        # budget mémoire réutilise celles de la mise en page sans les relire
+        self.infos = dict(infos or {})
+        # Budget mémoire en octets (voir ``memory``) : fixe, avant chaque
+        # rendu, le nombre de workers et la marge de décodage réduit
+        self.max_memory = max_memory
+        self.budget_workers: Optional[int] = None
+        self.decode_gap: Optional[float] = None
+
+    def checkpoint(self, done, total, stage):
+        """Publie l'avancement et lève ``JobCancelled`` si le rendu est annulé"""
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise JobCancelled()
+        if self.progress is not None:
+            self.progress(done, total, stage)
+
+    def tile_task(self, path, width, height):
+        """Tâche ``(chemin, taille, qualité, marge)`` de préparation d'une tuile"""
+        return path, (max(1, width), max(1, height)), self.quality, self.decode_gap
+
+    def fit_memory_budget(self, tiles, resident):
+        """Choisit workers et marge de décodage pour que le rendu tienne dans
+        ``max_memory``, compte tenu de la mémoire déjà occupée.
+
+        ``tiles`` est la liste ``(chemin, (largeur, hauteur))`` des tuiles et
+        ``resident`` la mémoire du canvas ou des bandes. Lève
+        ``MemoryBudgetError`` si le budget est trop petit.
+
+        Seule la mémoire du processus courant est mesurée : avec
+        ``executor='process'``, les workers décodent dans des processus
+        distincts dont la mémoire (interpréteur et décodages) n'est pas
+        comptée dans le budget.
+        """
+        if self.max_memory is None:
+            return
+        infos = self.read_image_infos([path for path, _ in tiles])
+        sized = [(info, size) for info, (_, size) in zip(infos, tiles) if info is not None]
+        tier_gap = QUALITIES[self.quality][0]
+        workers, gap = fit_budget(self.max_memory, resident, sized,
+                                  self.workers or os.cpu_count() or 1, tier_gap,
+                                  in_use=current_rss() or 0)
+        self.budget_workers = workers
+        self.decode_gap = gap if gap < tier_gap else None
+        logger.info("Budget %s : %d worker(s), marge de décodage %.1f, %s résidents",
+                    format_size(self.max_memory), workers, gap, format_size(resident))
+
+    def read_image_infos(self, image_paths):
+        """Métadonnées (dimensions, thème) de chaque image, None si illisible"""
+        missing = [path for path in dict.fromkeys(image_paths) if path not in self.infos]
+        if missing:
+            if self.index is not None:
+                found = self.index.lookup_many(missing)
+            else:
+                found = [probe_image(path) for path in missing]
+            self.infos.update(zip(missing, found))
+        return [self.infos[path] for path in image_paths]
+
+    def render(self, image_paths, width, height):
+        """Crée le collage puis élimine les marges de fond"""
+        return self.render_plan(self.plan(image_paths, width, height))
+
+    def render_to_file(self, image_paths, output_path, width, height,
+                       format: Optional[str] = None, **save_options):
+        """Crée le collage et l'écrit dans ``output_path``"""
+        return self.render_plan_to_file(self.plan(image_paths, width, height),
+                                        output_path, format=format, **save_options)
+
+    def render_plan(self, plan, scale=1.0, background: Optional[str] = None,
+                    tile_cache: Optional[dict] = None):
+        """Rend ``plan`` à l'échelle ``scale`` et élimine les marges de fond"""
+        background = background or plan.background
+        collage, bbox = self.compose_plan(plan, scale, background, tile_cache)
+        return self.post_process_collage(collage, background, bbox)
+
+    def render_plan_to_file(self, plan, output_path, scale=1.0,
+                            format: Optional[str] = None, **save_options):
+        """Rend ``plan`` et l'écrit dans ``output_path``.
+
+        ``save_options`` sont les options d'encodage (voir ``encoders``). Le
+        fichier est écrit sous un nom temporaire puis renommé : une erreur ou
+        une annulation ne laisse jamais de fichier incomplet.
+        """
+        format = format_for_path(output_path, format)
+        save_options = encoder_options(format, save_options)
+        collage = self.render_plan(plan, scale)
+        self.checkpoint(len(plan.tiles), len(plan.tiles), 'encode')
+        save_image(collage, output_path, format, **save_options)
+        return collage
+
+    def create_collage_image(self, image_paths, width, height):
+        """Crée l'image du collage"""
+        if self.show_themes:
+            return self._create_grid_collage(image_paths, width, height)
+        return self._create_dense_collage(image_paths, width, height)
+
+    def _create_grid_collage(self, image_paths, width, height):
+        """Crée un collage en grille avec espaces pour les thèmes"""
+        return self.compose_plan(self.grid_plan(image_paths, width, height))[0]
+
+    def _create_dense_collage(self, image_paths, width, height):
+        """Crée un collage dense avec dimensions optimisées"""
+        return self.compose_plan(self.dense_plan(image_paths, width, height))[0]
+
+    def plan(self, image_paths, width, height) -> LayoutPlan:
+        """Calcule la disposition du collage sans décoder aucune image"""
+        with span('layout', images=len(image_paths)):
+            if self.show_themes:
+                return self.grid_plan(image_paths, width, height)
+            return self.dense_plan(image_paths, width, height)
+
+    def grid_plan(self, image_paths, width, height) -> LayoutPlan:
+        """Disposition en grille avec espaces pour les thèmes"""
+        plan = LayoutPlan(mode='grid', background=self.background_color,
+                          requested=(width, height), size=(width, height))
+
+        # Calculer la disposition
+        n_images = len(image_paths)
+        if n_images == 0:
+            return plan
+
+        cols = math.ceil(math.sqrt(n_images))
+        rows = math.ceil(n_images / cols)
+
+        # Calculer la taille des vignettes avec padding
+        padding = 20  # Espace entre les images
+        text_height = 40  # Augmenter l'espace pour le texte pour accommoder les emojis
+        font_size = 20
+
+        # Calculer les dimensions des cellules
+        available_width = width - (cols + 1) * padding
+        available_height = height - (rows + 1) * padding - rows * text_height
+
+        if available_width <= 0 or available_height <= 0:
+            # Ajuster les dimensions minimales si nécessaire
+            cell_width = max(100, (width - (cols + 1) * padding) // cols)
+            cell_height = max(100, (height - (rows + 1) * padding - rows * text_height) // rows)
+        else:
+            cell_width = available_width // cols
+            cell_height = available_height // rows
+
+        # S'assurer que les dimensions sont positives
+        cell_width = max(50, cell_width)
+        cell_height = max(50, cell_height)
+
+        # Réduire la hauteur de l'image pour laisser de la place au texte
+        thumb_width = cell_width
+        thumb_height = cell_height
+
+        # Calculer la place de chaque image dans la grille
+        infos = self.read_image_infos(image_paths)
+        for idx, info in enumerate(infos):
+            if info is None:
+                continue
+
+            # Calculer la position dans la grille
+            row = idx // cols
+            col = idx % cols
+            cell_x = padding + col * (cell_width + padding)
+            cell_y = padding + row * (cell_height + padding)
+
+            # Calculer les dimensions pour conserver le ratio
+            img_ratio = info.ratio
+            thumb_ratio = thumb_width / thumb_height
+
+            if img_ratio > thumb_ratio:
+                # Image plus large que l'espace
+                new_width = thumb_width
+                new_height = int(thumb_width / img_ratio)
+            else:
+                # Image plus haute que l'espace
+                new_height = thumb_height
+                new_width = int(thumb_height * img_ratio)
+
+            # Centrer l'image dans son espace
+            paste_x = cell_x + (thumb_width - new_width) // 2
+            paste_y = cell_y + (thumb_height - new_height) // 2
+            plan.tiles.append(PlanTile(
+                info.path,
+                (paste_x / width, paste_y / height, new_width / width, new_height / height),
+                (new_width, new_height)))
+
+            # Le thème est écrit sous l'image, centré dans la cellule
+            if info.theme:
+                text_y = cell_y + thumb_height + 5
+                plan.captions.append(PlanCaption(
+                    info.theme,
+                    (cell_x / width, text_y / height, cell_width / width),
+                    font_size / height))
+
+        return plan
+
+    def dense_plan(self, image_paths, width, height) -> LayoutPlan:
+        """Disposition dense en lignes justifiées, calculée à partir des seules
+        dimensions lues dans les en-têtes"""
+        images = [(info.path, info.ratio)
+                  for info in self.read_image_infos(image_paths) if info is not None]
+
+        if not images:
+            return LayoutPlan(mode='dense', background=self.background_color,
+                              requested=(width, height), size=(width, height))
+
+        # Trier les images par ratio similaire
+        images.sort(key=lambda x: x[1], reverse=True)
+
+        # Trouver la meilleure disposition (lignes justifiées)
+        rows = [images[start:end] for start, end in
+                justified_layout([ratio for _, ratio in images], width, height)]
+
+        # Calculer les dimensions réelles nécessaires
+        real_height = 0
+        max_width = 0
+
+        for row in rows:
+            row_ratio = sum(ratio for _, ratio in row)
+            row_height = width / row_ratio
+            real_height += row_height
+            row_width = sum(ratio * row_height for _, ratio in row)
+            max_width = max(max_width, row_width)
+
+        # Ajuster les dimensions du canvas pour correspondre au contenu
+        scale = min(width / max_width, height / real_height)
+        final_width = int(max_width * scale)
+        final_height = int(real_height * scale)
+
+        plan = LayoutPlan(mode='dense', background=self.background_color,
+                          requested=(width, height), size=(final_width, final_height))
+
+        # Placer chaque tuile
+        y = 0
+        for row in rows:
+            row_ratio = sum(ratio for _, ratio in row)
+            row_height = (width / row_ratio) * scale
+            x = 0
+
+            for path, ratio in row:
+                img_width = int(row_height * ratio)
+                img_height = int(row_height)
+
+                plan.tiles.append(PlanTile(
+                    path,
+                    (x / final_width, int(y) / final_height,
+                     img_width / final_width, img_height / final_height),
+                    (img_width, img_height)))
+                x += img_width
+
+            y += row_height
+
+        return plan
+
+    def compose_plan(self, plan, scale=1.0, background: Optional[str] = None,
+                     tile_cache: Optional[dict] = None):
+        """Décode les tuiles du plan (en parallèle) et les colle sur un canvas.
+
+        ``tile_cache`` (dictionnaire ou ``memory.TileCache``, tâche -> tuile)
+        conserve les tuiles redimensionnées d'un rendu à l'autre : changer la
+        couleur de fond ne fait alors que recoller les tuiles, sans rien
+        décoder.
+
+        Retourne le collage et le rectangle exact de son contenu (tuiles
+        collées et thèmes), déduit de la disposition.
+        """
+        background = background or plan.background
+        size = plan.output_size(scale)
+        collage = Image.new('RGB', size, background)
+
+        rects = [pixel_rect(tile.rect, size) for tile in plan.tiles]
+        # Canvas, plus sa copie recadrée par ``post_process_collage``
+        self.fit_memory_budget([(tile.path, (w, h)) for tile, (_, _, w, h)
+                                in zip(plan.tiles, rects)], 2 * size[0] * size[1] * 3)
+        tasks = [self.tile_task(tile.path, w, h) for tile, (_, _, w, h) in zip(plan.tiles, rects)]
+        if tile_cache is None:
+            tiles = self.prepare_tiles(tasks)
+        else:
+            tiles = self.cached_tiles(tasks, tile_cache)
+        bbox = None
+        for done, ((x, y, _, _), img) in enumerate(zip(rects, tiles), 1):
+            self.checkpoint(done, len(rects), 'composite')
+            if img is not None:
+                with span('composite'):
+                    collage.paste(img, (x, y))
+                bbox = union_bbox(bbox, (x, y, x + img.width, y + img.height))
+
+        with span('composite', captions=len(plan.captions)):
+            bbox = union_bbox(bbox, self.draw_captions(collage, plan, background))
+        if bbox is not None:
+            bbox = (max(0, bbox[0]), max(0, bbox[1]),
+                    min(size[0], bbox[2]), min(size[1], bbox[3]))
+        return collage, bbox
+
+    def draw_captions(self, collage, plan, background):
+        """Écrit les thèmes du plan sur ``collage`` et retourne le rectangle
+        qui les contient (None sans thème)"""
+        if not plan.captions:
+            return None
+        from PIL import ImageDraw # type: ignore
+
+        draw = ImageDraw.Draw(collage)
+        width, height = collage.size
+        # Choisir la couleur du texte selon le fond
+        text_color = (0, 0, 0) if background.upper().startswith('#FFF') else (255, 255, 255)
+        fonts = {}
+        bbox = None
+
+        for caption in plan.captions:
+            font_size = max(1, round(caption.font_size * height))
+            if font_size not in fonts:
+                fonts[font_size] = load_font(font_size)
+            font = fonts[font_size]
+
+            cell_x, text_y, cell_width = caption.cell
+            # Calculer la largeur du texte pour le centrer
+            text_width = draw.textlength(caption.text, font=font)
+            text_x = round(cell_x * width) + (round(cell_width * width) - text_width) // 2
+            position = (text_x, round(text_y * height))
+            draw.text(position, caption.text, fill=text_color, font=font)
+            bbox = union_bbox(bbox, draw.textbbox(position, caption.text, font=font))
+        return bbox
+
+    def render_striped(self, image_paths, output_path, width, height,
+                       format: Optional[str] = None, **writer_options):
+        """Calcule la disposition puis l'écrit en bandes, voir ``render_plan_striped``"""
+        return self.render_plan_striped(self.plan(image_paths, width, height),
+                                        output_path, format=format, **writer_options)
+
+    def render_plan_striped(self, plan, output_path, scale=1.0,
+                            format: Optional[str] = None, **writer_options):
+        """Rend le collage dense ligne par ligne et écrit chaque bande dès
+        qu'elle est prête (PNG, TIFF ou tampon brut, voir ``striped``).
+
+        La mémoire utilisée est celle d'une ligne du collage et non celle du
+        canvas complet. Comme ``render_plan``, l'image est recadrée au
+        contenu. Le collage en grille (thèmes) n'est pas découpé en lignes
+        indépendantes : il est rendu en mémoire puis écrit en bandes.
+        Retourne les dimensions de l'image écrite.
+        """
+        if plan.mode != 'dense':
+            collage = self.render_plan(plan, scale)
+            with open_stripe_writer(output_path, collage.width, collage.height,
+                                    format, **writer_options) as writer:
+                for top in range(0, collage.height, STRIPE_HEIGHT):
+                    bottom = min(collage.height, top + STRIPE_HEIGHT)
+                    with span('encode'):
+                        writer.write(collage.crop((0, top, collage.width, bottom)))
+            return collage.size
+
+        size = plan.output_size(scale)
+        rects = [pixel_rect(tile.rect, size) for tile in plan.tiles]
+        if rects:
+            # Le contenu est connu par la disposition : les marges de fond sont
+            # retirées sans relire les pixels (les tuiles partent de 0, 0)
+            size = (max(x + w for x, _, w, _ in rects), max(y + h for _, y, _, h in rects))
+        final_width, final_height = size
+
+        # Les tuiles d'une même ligne partagent le même haut
+        rows = []
+        for tile, rect in zip(plan.tiles, rects):
+            if rows and rows[-1][0][1][1] == rect[1]:
+                rows[-1].append((tile, rect))
+            else:
+                rows.append([(tile, rect)])
+
+        # Une bande à la fois, plus les tampons du writer
+        band_height = max((h for _, _, _, h in rects), default=0)
+        self.fit_memory_budget([(tile.path, (w, h)) for tile, (_, _, w, h)
+                                in zip(plan.tiles, rects)], 2 * final_width * band_height * 3)
+        tasks = [self.tile_task(tile.path, w, h) for tile, (_, _, w, h) in zip(plan.tiles, rects)]
+        tiles = self.prepare_tiles(tasks)
+
+        with open_stripe_writer(output_path, final_width, final_height,
+                                format, **writer_options) as writer:
+            if not rows:
+                writer.write(Image.new('RGB', size, plan.background))
+            placed = 0
+            for index, row in enumerate(rows):
+                # La bande va du haut de cette ligne au haut de la suivante
+                top = row[0][1][1]
+                bottom = rows[index + 1][0][1][1] if index + 1 < len(rows) else final_height
+                band = Image.new('RGB', (final_width, bottom - top), plan.background)
+                for (_, (x, y, _, _)), img in zip(row, islice(tiles, len(row))):
+                    if img is not None:
+                        with span('composite'):
+                            band.paste(img, (x, y - top))
+                with span('encode'):
+                    writer.write(band)
+                placed += len(row)
+                self.checkpoint(placed, len(plan.tiles), 'composite')
+        return size
+
+    def cached_tiles(self, tasks, tile_cache):
+        """Comme ``prepare_tiles``, en ne préparant que les tuiles absentes de
+        ``tile_cache`` et en y rangeant les nouvelles"""
+        missing = list(dict.fromkeys(task for task in tasks if task not in tile_cache))
+        pending = set(missing)
+        # Produites dans l'ordre de leur première apparition dans ``tasks``
+        prepared = zip(missing, self.prepare_tiles(missing))
+        for task in tasks:
+            if task in pending:
+                pending.discard(task)
+                _, img = next(prepared)
+                tile_cache[task] = img
+            elif task in tile_cache:
+                img = tile_cache[task]
+            else:
+                # Évincée depuis sa préparation : cache plus petit que le rendu
+                img = load_tile(task)
+                tile_cache[task] = img
+            yield img
+
+    def prepare_tiles(self, tasks):
+        """Produit, dans l'ordre de ``tasks``, chaque tuile ``(chemin, taille,
+        qualité, marge)`` décodée et redimensionnée (None si l'image est illisible).
+
+        Le décodage et le redimensionnement sont indépendants d'une image à
+        l'autre et Pillow relâche le GIL pendant ces opérations : ils sont
+        répartis sur un pool de threads (ou de processus). Le nombre de
+        tuiles en avance est borné, pour que la mémoire reste proportionnelle
+        au nombre de workers et non à la taille du collage.
+        """
+        workers = self.budget_workers or self.workers or os.cpu_count() or 1
+        if workers <= 1 or len(tasks) <= 1:
+            yield from map(load_tile, tasks)
+            return
+
+        if self.executor == 'process':
+            pool = ProcessPoolExecutor(max_workers=workers)
+        else:
+            pool = ThreadPoolExecutor(max_workers=workers)
+        window = workers * TILES_AHEAD
+        with pool:
+            pending = deque()
+            try:
+                for task in tasks:
+                    pending.append(pool.submit(load_tile, task))
+                    if len(pending) >= window:
+                        yield pending.popleft().result()
+                while pending:
+                    yield pending.popleft().result()
+            finally:
+                # Rendu interrompu : ne pas décoder les tuiles d'avance
+                for future in pending:
+                    future.cancel()
+
+    def post_process_collage(self, collage, bg_color: Optional[str] = None, bbox=None):
+        """Post-traitement pour éliminer les espaces de fond en préservant strictement les ratios.
+
+        ``bbox`` est le rectangle du contenu connu par la disposition ; à
+        défaut, il est cherché en balayant les pixels.
+        """
+        if bg_color is None:
+            bg_color = self.background_color
+        try:
+            if bbox is None:
+                with span('post-process'):
+                    bbox = content_bbox(collage, bg_color)
+            if bbox is None or tuple(bbox) == (0, 0) + collage.size:
+                return collage
+
+            # Simple recadrage aux limites du contenu
+            with span('post-process'):
+                return collage.crop(tuple(int(v) for v in bbox))
+
+        except Exception as e:
+            logger.error("Erreur lors du post-traitement: %s", e)
+            return collage
@@ -0,0 +1,225 @@
+"""Recherche récursive des images d'un dossier, indépendante de Tk.
+
+Chaque dossier est lu avec ``os.scandir`` sur un pool de threads ; ses
+sous-dossiers sont soumis au pool dès qu'ils sont découverts. Les fichiers
+sont reconnus à leur signature (premiers octets) et non à leur extension.
+Les chemins trouvés sont publiés au fil de l'eau : l'interface les récupère
+avec ``poll()`` pour les transmettre à l'importeur sans attendre la fin du
+parcours.
+
+Les fichiers déjà vus et inchangés (même date de modification et même
+taille) sont ignorés, ce qui permet de redéposer un dossier pour n'ajouter
+que ses nouvelles images.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from themes import PNG_SIGNATURE
+
+logger = logging.getLogger(__name__)
+
+# Octets lus pour reconnaître le format
+SNIFF_BYTES = 16
+
+
+def sniff_image_format(header: bytes) -> Optional[str]:
+    """Format d'image reconnu à partir des premiers octets d'un fichier"""
+    if header.startswith(b'\xff\xd8\xff'):
+        return 'JPEG'
+    if header.startswith(PNG_SIGNATURE):
+        return 'PNG'
+    if header[:6] in (b'GIF87a', b'GIF89a'):
+        return 'GIF'
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'WEBP'
+    if header[:4] in (b'II*\0', b'MM\0*'):
+        return 'TIFF'
+    if header[:2] == b'BM':
+        return 'BMP'
+    if header[4:8] == b'ftyp' and header[8:12] in (b'avif', b'avis'):
+        return 'AVIF'
+    return None
+
+
+def sniff_file(path) -> Optional[str]:
+    """Format d'image du fichier ``path`` (None si ce n'est pas une image)"""
+    try:
+        with open(path, 'rb') as f:
+            return sniff_image_format(f.read(SNIFF_BYTES))
+    except OSError:
+        return None
+
+
+class FolderScanner:
+    """Parcourt des dossiers (et fichiers) en parallèle et publie les images
+    trouvées.
+
+    ``known`` associe un chemin à ``(mtime_ns, taille)`` ; il est complété à
+    chaque image publiée et peut être partagé d'un parcours à l'autre.
+    Les fichiers modifiés depuis moins de ``settle`` secondes, peut-être en
+    cours d'écriture, sont laissés pour un parcours suivant.
+    """
+
+    def __init__(self, workers: Optional[int] = None,
+                 known: Optional[Dict[str, Tuple[int, int]]] = None,
+                 settle: float = 0.0):
+        self.workers = workers or min(8, (os.cpu_count() or 1) * 2)
+        self.known = known if known is not None else {}
+        self.settle = settle
+        self.found = 0
+        self._results = deque()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def active(self) -> bool:
+        """Vrai tant que le parcours continue ou que des chemins restent à récupérer"""
+        return self._pending > 0 or bool(self._results)
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def start(self, paths):
+        """Lance le parcours de ``paths`` (dossiers ou fichiers) sans bloquer"""
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers,
+                                            thread_name_prefix='scan')
+        if not self.active:
+            self.found = 0
+        self._cancel.clear()
+        files = []
+        for path in paths:
+            path = os.fspath(path)
+            if os.path.isdir(path):
+                self._submit_dir(path)
+            else:
+                files.append(path)
+        if files:
+            self._submit(self._scan_files, files)
+
+    def _submit(self, function, argument):
+        with self._lock:
+            self._pending += 1
+        try:
+            self._pool.submit(self._run, function, argument)
+        except RuntimeError:
+            # Pool arrêté pendant le parcours
+            with self._lock:
+                self._pending -= 1
+
+    def _submit_dir(self, path):
+        self._submit(self._scan_dir, path)
+
+    def _run(self, function, argument):
+        try:
+            if not self._cancel.is_set():
+                function(argument)
+        except Exception as e:
+            logger.warning("Erreur lors du parcours de %s: %s", argument, e)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _scan_dir(self, path):
+        with os.scandir(path) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+        files = []
+        for entry in entries:
+            if entry.name.startswith('.'):
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    self._submit_dir(entry.path)
+                elif entry.is_file():
+                    files.append(entry.path)
+            except OSError:
+                continue
+        self._scan_files(files)
+
+    def _scan_files(self, paths):
+        found = []
+        recent = time.time_ns() - int(self.settle * 1e9)
+        for path in paths:
+            if self._cancel.is_set():
+                return
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            signature = (st.st_mtime_ns, st.st_size)
+            if self.known.get(path) == signature:
+                continue
+            if self.settle and st.st_mtime_ns > recent:
+                continue
+            if sniff_file(path) is None:
+                continue
+            found.append((path, signature))
+        if found:
+            with self._lock:
+                # ``cancel()`` a pu vider les résultats pendant ce parcours :
+                # rien n'est ajouté, ni à ``known`` ni aux résultats
+                if self._cancel.is_set():
+                    return
+                for path, signature in found:
+                    # Un autre parcours a pu trouver le même fichier entre-temps
+                    if self.known.get(path) != signature:
+                        self.known[path] = signature
+                        self._results.append(path)
+                        self.found += 1
+
+    def poll(self, max_items: int = 256) -> List[str]:
+        """Retourne sans bloquer les chemins trouvés depuis le dernier appel"""
+        with self._lock:
+            count = min(max_items, len(self._results))
+            return [self._results.popleft() for _ in range(count)]
+
+    def wait(self):
+        """Attend la fin du parcours et retourne tous les chemins restants"""
+        paths = []
+        while True:
+            paths.extend(self.poll(1 << 30))
+            with self._lock:
+                if self._pending == 0 and not self._results:
+                    return paths
+            self._cancel.wait(0.005)
+
+    def cancel(self):
+        """Abandonne le parcours en cours.
+
+        Les chemins trouvés mais pas encore récupérés sont retirés de
+        ``known`` pour être retrouvés par un prochain parcours.
+        """
+        self._cancel.set()
+        with self._lock:
+            self.forget(self._results)
+            self._results.clear()
+            self.found = 0
+
+    def forget(self, paths):
+        """Retire ``paths`` des fichiers connus (import abandonné)"""
+        for path in paths:
+            self.known.pop(path, None)
+
+    def shutdown(self):
+        self.cancel()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+def scan_paths(paths, workers: Optional[int] = None) -> List[str]:
+    """Liste triée des images trouvées sous ``paths`` (bloquant)"""
+    scanner = FolderScanner(workers)
+    try:
+        scanner.start(paths)
+        return sorted(scanner.wait())
+    finally:
+        scanner.shutdown()
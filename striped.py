@@ -0,0 +1,275 @@
+"""Écriture en bandes horizontales des très grands collages.
+
+Au lieu d'allouer toute l'image de sortie, le rendu produit des bandes
+successives (une ligne du collage dense) qui sont encodées et écrites dès
+qu'elles sont prêtes : la mémoire utilisée est celle d'une bande, pas celle
+du canvas complet.
+
+Formats pris en charge :
+
+- PNG (compression zlib en flux, filtre « Sub ») ;
+- TIFF non compressé (BigTIFF automatiquement au-delà de 4 Go) ;
+- tampon brut projeté en mémoire : ``.npy`` (en-tête NumPy) ou ``.raw``
+  (octets RGB bruts, ligne par ligne).
+"""
+import os
+import struct
+import zlib
+
+STRIPE_FORMATS = {
+    '.png': 'PNG',
+    '.tif': 'TIFF',
+    '.tiff': 'TIFF',
+    '.npy': 'NPY',
+    '.raw': 'RAW',
+}
+
+
+def stripe_format_for(path, format=None):
+    """Format d'écriture en bandes pour ``path`` ou ``format`` (nom ou
+    extension), None si non pris en charge"""
+    if format is not None:
+        if format.upper() in STRIPE_FORMATS.values():
+            return format.upper()
+        return STRIPE_FORMATS.get('.' + format.lower().lstrip('.'))
+    return STRIPE_FORMATS.get(os.path.splitext(str(path))[1].lower())
+
+
+def open_stripe_writer(path, width, height, format=None, **options):
+    """Ouvre le writer adapté au format (déduit de l'extension par défaut)"""
+    writers = {
+        'PNG': PNGStripeWriter,
+        'TIFF': TIFFStripeWriter,
+        'NPY': RawStripeWriter,
+        'RAW': RawStripeWriter,
+    }
+    stripe_format = stripe_format_for(path, format)
+    if stripe_format is None:
+        raise ValueError(f"Format non pris en charge pour l'écriture en bandes: {path}")
+    if stripe_format in ('NPY', 'RAW'):
+        options.setdefault('header', stripe_format == 'NPY')
+    return writers[stripe_format](path, width, height, **options)
+
+
+def _band_array(band, width):
+    """Convertit une bande (image PIL ou tableau) en tableau uint8 (h, w, 3)"""
+    import numpy as np # type: ignore
+
+    if not isinstance(band, np.ndarray):
+        if band.mode != 'RGB':
+            band = band.convert('RGB')
+        band = np.asarray(band)
+    if band.ndim != 3 or band.shape[1] != width or band.shape[2] != 3:
+        raise ValueError(f"Bande de forme {band.shape} incompatible avec la largeur {width}")
+    return np.ascontiguousarray(band, dtype=np.uint8)
+
+
+class StripeWriter:
+    """Base commune : compte les lignes écrites et vérifie la hauteur finale"""
+
+    def __init__(self, path, width, height):
+        if width <= 0 or height <= 0:
+            raise ValueError(f"Dimensions invalides: {width}x{height}")
+        self.path = str(path)
+        self.width = width
+        self.height = height
+        self.rows_written = 0
+        self.closed = False
+
+    def write(self, band):
+        """Ajoute une bande de lignes sous les précédentes"""
+        rows = _band_array(band, self.width)
+        if self.rows_written + rows.shape[0] > self.height:
+            raise ValueError("La bande dépasse la hauteur annoncée de l'image")
+        self._write_rows(rows)
+        self.rows_written += rows.shape[0]
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self.rows_written != self.height:
+            self._abort()
+            raise ValueError(f"{self.rows_written} lignes écrites sur {self.height}")
+        self._finish()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        elif not self.closed:
+            self.closed = True
+            self._abort()
+
+    def _write_rows(self, rows):
+        raise NotImplementedError
+
+    def _finish(self):
+        raise NotImplementedError
+
+    def _abort(self):
+        raise NotImplementedError
+
+
+class PNGStripeWriter(StripeWriter):
+    """PNG RGB 8 bits encodé au fil de l'eau"""
+
+    # Taille maximale d'un chunk IDAT
+    CHUNK_SIZE = 1 << 20
+
+    def __init__(self, path, width, height, compress_level=6):
+        super().__init__(path, width, height)
+        self._file = open(self.path, 'wb')
+        self._compressor = zlib.compressobj(compress_level)
+        self._pending = bytearray()
+        self._file.write(b'\x89PNG\r\n\x1a\n')
+        # IHDR : largeur, hauteur, 8 bits, RGB, compression, filtre, non entrelacé
+        self._chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+
+    def _chunk(self, kind, data):
+        self._file.write(struct.pack('>I', len(data)))
+        self._file.write(kind)
+        self._file.write(data)
+        self._file.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(kind))))
+
+    def _write_rows(self, rows):
+        import numpy as np # type: ignore
+
+        height = rows.shape[0]
+        flat = rows.reshape(height, self.width * 3)
+        # Filtre « Sub » : chaque octet moins celui du pixel de gauche
+        filtered = np.empty((height, self.width * 3 + 1), dtype=np.uint8)
+        filtered[:, 0] = 1
+        filtered[:, 1:4] = flat[:, :3]
+        np.subtract(flat[:, 3:], flat[:, :-3], out=filtered[:, 4:])
+        self._pending += self._compressor.compress(filtered.tobytes())
+        self._flush_chunks()
+
+    def _flush_chunks(self, final=False):
+        while len(self._pending) >= self.CHUNK_SIZE or (final and self._pending):
+            self._chunk(b'IDAT', bytes(self._pending[:self.CHUNK_SIZE]))
+            del self._pending[:self.CHUNK_SIZE]
+
+    def _finish(self):
+        self._pending += self._compressor.flush()
+        self._flush_chunks(final=True)
+        self._chunk(b'IEND', b'')
+        self._file.close()
+
+    def _abort(self):
+        self._file.close()
+        os.unlink(self.path)
+
+
+class TIFFStripeWriter(StripeWriter):
+    """TIFF RGB non compressé : les pixels sont écrits à la suite, l'IFD à la fin"""
+
+    ROWS_PER_STRIP = 64
+    _CLASSIC_LIMIT = 2 ** 32 - 2 ** 20
+
+    def __init__(self, path, width, height):
+        super().__init__(path, width, height)
+        self.row_bytes = width * 3
+        self.bigtiff = self.row_bytes * height >= self._CLASSIC_LIMIT
+        self._file = open(self.path, 'wb')
+        if self.bigtiff:
+            # En-tête BigTIFF : II, 43, taille des offsets, réservé, offset de l'IFD
+            self._file.write(struct.pack('<2sHHHQ', b'II', 43, 8, 0, 0))
+            self._ifd_pointer = 8
+        else:
+            self._file.write(struct.pack('<2sHI', b'II', 42, 0))
+            self._ifd_pointer = 4
+        self.data_offset = self._file.tell()
+
+    def _write_rows(self, rows):
+        self._file.write(rows.tobytes())
+
+    def _finish(self):
+        f = self._file
+        n_strips = (self.height + self.ROWS_PER_STRIP - 1) // self.ROWS_PER_STRIP
+        strip_bytes = self.ROWS_PER_STRIP * self.row_bytes
+        offsets = [self.data_offset + i * strip_bytes for i in range(n_strips)]
+        counts = [min(strip_bytes, self.height * self.row_bytes - i * strip_bytes)
+                  for i in range(n_strips)]
+
+        offset_type, offset_fmt = (16, 'Q') if self.bigtiff else (4, 'I')
+
+        # Valeurs trop grandes pour tenir dans l'entrée de l'IFD
+        if f.tell() % 2:
+            f.write(b'\0')
+        bits_offset = f.tell()
+        f.write(struct.pack('<HHH', 8, 8, 8))
+        offsets_offset = f.tell()
+        f.write(struct.pack(f'<{n_strips}{offset_fmt}', *offsets))
+        counts_offset = f.tell()
+        f.write(struct.pack(f'<{n_strips}{offset_fmt}', *counts))
+        if f.tell() % 2:
+            f.write(b'\0')
+
+        # (tag, type, nombre, valeur) ; types : 3 = SHORT, 4 = LONG, 16 = LONG8
+        entries = [
+            (256, 4, 1, self.width),                    # ImageWidth
+            (257, 4, 1, self.height),                   # ImageLength
+            (258, 3, 3, bits_offset),                   # BitsPerSample
+            (259, 3, 1, 1),                             # Compression : aucune
+            (262, 3, 1, 2),                             # Photometric : RGB
+            (273, offset_type, n_strips, offsets[0] if n_strips == 1 else offsets_offset),
+            (277, 3, 1, 3),                             # SamplesPerPixel
+            (278, 4, 1, self.ROWS_PER_STRIP),           # RowsPerStrip
+            (279, offset_type, n_strips, counts[0] if n_strips == 1 else counts_offset),
+            (284, 3, 1, 1),                             # PlanarConfiguration
+        ]
+
+        ifd_offset = f.tell()
+        if self.bigtiff:
+            f.write(struct.pack('<Q', len(entries)))
+            for tag, kind, count, value in entries:
+                if tag == 258:
+                    # Les trois SHORT tiennent dans les 8 octets de l'entrée
+                    f.write(struct.pack('<HHQHHH2x', tag, kind, count, 8, 8, 8))
+                    continue
+                value_fmt = 'H6x' if kind == 3 and count == 1 else 'Q'
+                f.write(struct.pack(f'<HHQ{value_fmt}', tag, kind, count, value))
+            f.write(struct.pack('<Q', 0))
+        else:
+            f.write(struct.pack('<H', len(entries)))
+            for tag, kind, count, value in entries:
+                value_fmt = 'H2x' if kind == 3 and count == 1 else 'I'
+                f.write(struct.pack(f'<HHI{value_fmt}', tag, kind, count, value))
+            f.write(struct.pack('<I', 0))
+
+        f.seek(self._ifd_pointer)
+        f.write(struct.pack('<Q' if self.bigtiff else '<I', ifd_offset))
+        f.close()
+
+    def _abort(self):
+        self._file.close()
+        os.unlink(self.path)
+
+
+class RawStripeWriter(StripeWriter):
+    """Tampon RGB projeté en mémoire (``.npy`` avec en-tête, ou brut)"""
+
+    def __init__(self, path, width, height, header=True):
+        import numpy as np # type: ignore
+
+        super().__init__(path, width, height)
+        shape = (height, width, 3)
+        if header:
+            self.buffer = np.lib.format.open_memmap(self.path, mode='w+',
+                                                    dtype=np.uint8, shape=shape)
+        else:
+            self.buffer = np.memmap(self.path, mode='w+', dtype=np.uint8, shape=shape)
+
+    def _write_rows(self, rows):
+        self.buffer[self.rows_written:self.rows_written + rows.shape[0]] = rows
+
+    def _finish(self):
+        self.buffer.flush()
+        del self.buffer
+
+    def _abort(self):
+        del self.buffer
+        os.unlink(self.path)
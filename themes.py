@@ -0,0 +1,144 @@
+"""Extraction du thème MegaPromptV3 des images générées par ComfyUI.
+
+Le thème est stocké dans le champ texte ``prompt`` des PNG (graphe ComfyUI
+en JSON). Pour les PNG, ``read_png_header`` parcourt directement les chunks
+du fichier et s'arrête au premier ``IDAT`` : seuls l'en-tête et les champs
+texte demandés sont lus, les pixels jamais. Le thème de chaque fichier est
+ensuite mémorisé par l'index des métadonnées (``metadata_index``), tant que
+le fichier ne change pas.
+"""
+import json
+import logging
+import os
+import struct
+import zlib
+from functools import lru_cache
+
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# Mode Pillow selon le type de couleur PNG (et la profondeur pour les gris)
+_PNG_MODES = {0: 'L', 2: 'RGB', 3: 'P', 4: 'LA', 6: 'RGBA'}
+
+@lru_cache(maxsize=1)
+def _emoji_table():
+    """Table de ``str.translate`` qui supprime les emojis, ainsi que les
+    sélecteurs de variation et liants qui composent les séquences"""
+    import emoji
+
+    table = {ord(c): None for c in emoji.EMOJI_DATA if len(c) == 1}
+    table[0xFE0F] = None  # sélecteur de variation « emoji »
+    table[0x200D] = None  # liant sans chasse (séquences ZWJ)
+    return table
+
+
+def strip_emoji(text):
+    """Retire les emojis de ``text`` et les espaces aux extrémités"""
+    return text.translate(_emoji_table()).strip()
+
+
+def theme_from_prompt(prompt):
+    """Thème du nœud MegaPromptV3 du graphe ComfyUI ``prompt`` (JSON)"""
+    with span('theme-extract'):
+        return _theme_from_prompt(prompt)
+
+
+def _theme_from_prompt(prompt):
+    # Le graphe n'est analysé que s'il peut contenir le nœud recherché
+    if not prompt or 'MegaPromptV3' not in prompt:
+        return None
+    try:
+        metadata_dict = json.loads(prompt)
+
+        # Look for theme in MegaPromptV3 node (207)
+        for node_id, node_data in metadata_dict.items():
+            if node_data.get('class_type') == 'MegaPromptV3':
+                theme = node_data.get('inputs', {}).get('theme', '')
+                if theme:
+                    # Remove emoji and leading/trailing whitespace
+                    theme = strip_emoji(theme)
+                    logger.debug("Found theme: %s", theme)
+                    return theme
+    except Exception as e:
+        logger.debug("Error extracting theme: %s", e)
+    return None
+
+
+def extract_theme_from_metadata(img):
+    """Extrait le thème depuis les métadonnées de l'image"""
+    theme = theme_from_prompt(img.info.get('prompt'))
+    if theme is None:
+        logger.debug("No theme found in metadata")
+    return theme
+
+
+def _decode_text_chunk(kind, data, keys):
+    """(clé, texte) d'un chunk tEXt, zTXt ou iTXt, ou None si la clé n'est
+    pas demandée"""
+    keyword, sep, rest = data.partition(b'\0')
+    if not sep:
+        return None
+    key = keyword.decode('latin-1')
+    if keys is not None and key not in keys:
+        return None
+
+    if kind == b'tEXt':
+        return key, rest.decode('latin-1')
+    if kind == b'zTXt':
+        # Octet de méthode de compression (toujours 0 = zlib) puis données
+        return key, zlib.decompress(rest[1:]).decode('latin-1')
+    # iTXt : drapeau de compression, méthode, langue\0, mot-clé traduit\0, texte UTF-8
+    compressed = rest[0]
+    _, _, rest = rest[2:].partition(b'\0')
+    _, _, text = rest.partition(b'\0')
+    if compressed:
+        text = zlib.decompress(text)
+    return key, text.decode('utf-8')
+
+
+def read_png_header(path, keys=('prompt',)):
+    """Lit l'en-tête et les champs texte d'un PNG sans décoder les pixels.
+
+    Retourne ``None`` si le fichier n'est pas un PNG, sinon un dictionnaire
+    ``{'size', 'mode', 'text', 'exif'}`` où ``text`` ne contient que les
+    clés demandées (toutes si ``keys`` vaut None) et ``exif`` indique la
+    présence d'un chunk eXIf.
+    """
+    keys = None if keys is None else set(keys)
+    header = {'size': None, 'mode': None, 'text': {}, 'exif': False}
+    with open(path, 'rb') as f:
+        if f.read(8) != PNG_SIGNATURE:
+            return None
+        while True:
+            head = f.read(8)
+            if len(head) < 8:
+                break
+            length, kind = struct.unpack('>I4s', head)
+            if kind in (b'IDAT', b'IEND'):
+                break
+            if kind == b'IHDR':
+                width, height, depth, color = struct.unpack('>IIBB', f.read(10))
+                mode = _PNG_MODES.get(color)
+                if color == 0 and depth == 1:
+                    mode = '1'
+                elif color == 0 and depth == 16:
+                    mode = 'I;16'
+                header['size'] = (width, height)
+                header['mode'] = mode
+                f.seek(length - 10 + 4, os.SEEK_CUR)
+            elif kind in (b'tEXt', b'zTXt', b'iTXt'):
+                item = _decode_text_chunk(kind, f.read(length), keys)
+                if item is not None:
+                    header['text'][item[0]] = item[1]
+                f.seek(4, os.SEEK_CUR)
+            else:
+                header['exif'] = header['exif'] or kind == b'eXIf'
+                # Chunk ignoré : données et CRC
+                f.seek(length + 4, os.SEEK_CUR)
+    if header['size'] is None:
+        raise ValueError(f"PNG sans en-tête IHDR: {path}")
+    return header
+
@@ -0,0 +1,146 @@
+"""Cache disque des miniatures de la grille.
+
+Les miniatures sont rangées sous le dossier de cache de l'application et
+adressées par le contenu présumé du fichier source (chemin absolu, date de
+modification, taille) et la taille de la miniature. Le cache est borné en
+octets ; au-delà, les fichiers les moins récemment utilisés sont supprimés.
+"""
+import hashlib
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+from PIL import Image, features # type: ignore
+
+from metadata_index import default_cache_dir
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Après une éviction, on redescend sous cette fraction du plafond pour ne pas
+# balayer le dossier à chaque nouvelle miniature
+_EVICT_TARGET = 0.9
+
+
+def default_thumbnail_dir() -> Path:
+    return default_cache_dir() / 'thumbnails'
+
+
+class ThumbnailCache:
+    """Cache LRU de miniatures sur disque, plafonné en octets"""
+
+    def __init__(self, cache_dir=None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else default_thumbnail_dir()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.extension = '.webp' if features.check('webp') else '.png'
+        self._lock = threading.Lock()
+        self._total_bytes = sum(size for _, _, size in self._entries())
+
+    def key(self, path, size) -> Optional[str]:
+        """Clé du cache pour ``path`` à la taille ``size`` (None si introuvable)"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        raw = f"{os.path.abspath(path)}\0{st.st_mtime_ns}\0{st.st_size}\0{size[0]}x{size[1]}"
+        return hashlib.sha1(raw.encode('utf-8', 'surrogatepass')).hexdigest()
+
+    def _file_for(self, key) -> Path:
+        return self.cache_dir / key[:2] / (key + self.extension)
+
+    def get(self, path, size) -> Optional[Image.Image]:
+        """Retourne la miniature en cache, ou None"""
+        key = self.key(path, size)
+        if key is None:
+            return None
+        cache_file = self._file_for(key)
+        try:
+            with Image.open(cache_file) as img:
+                img.load()
+            # Marquer l'entrée comme récemment utilisée
+            os.utime(cache_file)
+            return img
+        except (OSError, ValueError):
+            return None
+
+    def put(self, path, size, img):
+        """Enregistre la miniature ``img`` de ``path``"""
+        key = self.key(path, size)
+        if key is None:
+            return
+        cache_file = self._file_for(key)
+        cache_file.parent.mkdir(exist_ok=True)
+        tmp_file = cache_file.with_name(
+            f"{cache_file.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            if self.extension == '.webp':
+                img.save(tmp_file, format='WEBP', quality=90, method=4)
+            else:
+                img.save(tmp_file, format='PNG')
+            # Une entrée remplacée ne compte plus dans le total
+            try:
+                replaced = cache_file.stat().st_size
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(tmp_file, cache_file)
+            written = cache_file.stat().st_size
+        except OSError as e:
+            logger.warning("Impossible d'écrire la miniature de %s: %s", path, e)
+            tmp_file.unlink(missing_ok=True)
+            return
+
+        with self._lock:
+            self._total_bytes += written - replaced
+            over_budget = self._total_bytes > self.max_bytes
+        if over_budget:
+            self.evict()
+
+    def get_or_create(self, path, size, factory):
+        """Retourne la miniature en cache, ou la crée avec ``factory()`` et la stocke"""
+        img = self.get(path, size)
+        if img is None:
+            img = factory()
+            self.put(path, size, img)
+        return img
+
+    def evict(self):
+        """Supprime les entrées les moins récemment utilisées au-delà du plafond"""
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _, _, size in entries)
+            target = self.max_bytes * _EVICT_TARGET
+            for _, cache_file, size in entries:
+                if total <= target:
+                    break
+                try:
+                    cache_file.unlink()
+                    total -= size
+                except OSError:
+                    pass
+            self._total_bytes = total
+
+    def clear(self):
+        with self._lock:
+            for _, cache_file, _ in self._entries():
+                cache_file.unlink(missing_ok=True)
+            self._total_bytes = 0
+
+    def _entries(self):
+        """(dernière utilisation, chemin, taille) de chaque miniature en cache"""
+        entries = []
+        for sub in os.scandir(self.cache_dir):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if not entry.name.endswith(self.extension):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, Path(entry.path), st.st_size))
+        return entries
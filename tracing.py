@@ -0,0 +1,177 @@
+"""Mesure du temps passé dans chaque étape du rendu.
+
+Les étapes sont délimitées par des intervalles nommés (« spans ») :
+
+    with span('decode', path=path):
+        ...
+
+Noms utilisés : ``decode``, ``resize``, ``layout``, ``composite``,
+``post-process``, ``encode``, ``theme-extract``. Les spans peuvent
+s'imbriquer (``layout`` inclut la lecture des thèmes quand l'index ne les
+connaît pas encore) : les totaux du tableau sont inclusifs.
+
+La mesure est désactivée par défaut et ne coûte alors qu'un appel de
+fonction. Elle s'active avec ``enable()``, l'option ``--trace`` de la ligne de
+commande ou la variable d'environnement ``WEBCOLLAGE_TRACE`` :
+
+- ``WEBCOLLAGE_TRACE=summary`` : tableau récapitulatif sur la sortie d'erreur
+  à la fin du programme ;
+- ``WEBCOLLAGE_TRACE=trace.json`` : fichier au format Chrome Trace, lisible
+  dans ``chrome://tracing`` ou Perfetto.
+
+Les jobs rendus en parallèle par ``cli`` renvoient leurs spans avec leur
+résultat (``collect()``), fusionnés dans le tracer du processus principal
+(``merge()``). En revanche, avec le pool de processus de préparation des
+tuiles (``--tile-executor process``), le décodage fait dans ces workers
+n'apparaît pas.
+"""
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from typing import Optional
+
+TRACE_ENV = 'WEBCOLLAGE_TRACE'
+
+# Destination qui produit le tableau récapitulatif plutôt qu'un fichier
+SUMMARY = 'summary'
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'args', 'start')
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.tracer.record(self.name, self.start, time.perf_counter(), self.args)
+        return False
+
+
+class Tracer:
+    """Enregistre les spans terminés ; utilisable depuis plusieurs threads"""
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.events = []
+        self._lock = threading.Lock()
+
+    def span(self, name, **args):
+        return _Span(self, name, args)
+
+    def record(self, name, start, end, args=None):
+        event = (name, start, end, os.getpid(), threading.get_ident(), args)
+        with self._lock:
+            self.events.append(event)
+
+    def collect(self):
+        """Retire et retourne les événements enregistrés (pour les transmettre
+        au processus principal)"""
+        with self._lock:
+            events, self.events = self.events, []
+        return events
+
+    def merge(self, events):
+        """Ajoute les événements ``collect()`` d'un autre processus"""
+        with self._lock:
+            self.events.extend(events)
+
+    def summary(self):
+        """Par nom : nombre d'appels, total, moyenne et maximum (secondes)"""
+        stats = {}
+        for name, start, end, _, _, _ in self.events:
+            count, total, longest = stats.get(name, (0, 0.0, 0.0))
+            duration = end - start
+            stats[name] = (count + 1, total + duration, max(longest, duration))
+        return [{'name': name, 'count': count, 'total': total,
+                 'mean': total / count, 'max': longest}
+                for name, (count, total, longest)
+                in sorted(stats.items(), key=lambda item: -item[1][1])]
+
+    def format_summary(self):
+        lines = [f"{'étape':<16}{'appels':>8}{'total (s)':>12}{'moyenne (ms)':>14}{'max (ms)':>12}"]
+        for row in self.summary():
+            lines.append(f"{row['name']:<16}{row['count']:>8}{row['total']:>12.3f}"
+                         f"{row['mean'] * 1000:>14.2f}{row['max'] * 1000:>12.2f}")
+        return '\n'.join(lines)
+
+    def chrome_trace(self):
+        """Événements au format Chrome Trace (durées en microsecondes)"""
+        events = []
+        for name, start, end, pid, tid, args in self.events:
+            event = {'name': name, 'ph': 'X', 'pid': pid, 'tid': tid,
+                     'ts': round((start - self.origin) * 1e6, 1),
+                     'dur': round((end - start) * 1e6, 1)}
+            if args:
+                event['args'] = {key: str(value) for key, value in args.items()}
+            events.append(event)
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write_chrome_trace(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.chrome_trace(), f)
+
+    def report(self, destination):
+        """Écrit le tableau récapitulatif (``summary``) ou le fichier de trace"""
+        if destination == SUMMARY:
+            print(self.format_summary(), file=sys.stderr)
+        else:
+            self.write_chrome_trace(destination)
+
+
+_tracer: Optional[Tracer] = None
+
+
+def enable() -> Tracer:
+    """Active l'enregistrement des spans et retourne le tracer"""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer()
+    return _tracer
+
+
+def disable():
+    global _tracer
+    _tracer = None
+
+
+def get_tracer() -> Optional[Tracer]:
+    return _tracer
+
+
+def span(name, **args):
+    """Intervalle nommé ; sans effet tant que la mesure n'est pas activée"""
+    tracer = _tracer
+    if tracer is None:
+        return _NULL_SPAN
+    return tracer.span(name, **args)
+
+
+def enable_from_env(destination: Optional[str] = None):
+    """Active la mesure si ``destination`` (ou ``WEBCOLLAGE_TRACE``) est défini
+    et programme le rapport à la fin du programme"""
+    destination = destination or os.environ.get(TRACE_ENV)
+    if not destination:
+        return None
+    tracer = enable()
+    atexit.register(tracer.report, destination)
+    return tracer
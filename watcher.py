@@ -0,0 +1,182 @@
+"""Surveillance d'un dossier : nouvelles images déposées, indépendante de Tk.
+
+Sous Linux, les notifications du noyau (inotify, via ``ctypes``) signalent
+les fichiers terminés d'écrire (``IN_CLOSE_WRITE``) ou déplacés dans le
+dossier (``IN_MOVED_TO``) ; les sous-dossiers créés sont surveillés à leur
+tour. Ailleurs, ou si inotify est indisponible, le dossier est reparcouru à
+intervalle régulier. Dans les deux cas, les chemins passent par
+``scanner.FolderScanner`` : reconnaissance par signature et fichiers
+inchangés ignorés.
+"""
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import time
+from typing import List, Optional
+
+from scanner import FolderScanner
+
+logger = logging.getLogger(__name__)
+
+# Intervalle (s) entre deux parcours en mode scrutation
+POLL_INTERVAL = 1.0
+
+# Masques inotify (<sys/inotify.h>)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, 'O_CLOEXEC', 0)
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+_EVENT = struct.Struct('iIII')
+
+
+def _load_inotify():
+    """Fonctions inotify de la libc, ou None hors Linux"""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        return libc if hasattr(libc, 'inotify_init1') else None
+    except OSError:
+        return None
+
+
+class DirectoryWatcher:
+    """Signale les images nouvelles ou modifiées sous ``root``.
+
+    ``initial()`` retourne les images déjà présentes ; ``changes()`` attend
+    ensuite les suivantes. ``use_inotify=False`` force la scrutation.
+    """
+
+    def __init__(self, root, interval: float = POLL_INTERVAL,
+                 use_inotify: Optional[bool] = None, workers: Optional[int] = None):
+        self.root = os.fspath(root)
+        self.interval = interval
+        # En scrutation, un fichier encore en cours d'écriture est repris au
+        # parcours suivant
+        self.scanner = FolderScanner(workers, settle=interval)
+        self._fd = None
+        self._watches = {}
+        self._rescan = False
+        self._last_poll = 0.0
+        self._libc = _load_inotify() if use_inotify is not False else None
+        if self._libc is not None:
+            self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if self._fd < 0:
+                logger.info("inotify indisponible (%s), scrutation du dossier",
+                            os.strerror(ctypes.get_errno()))
+                self._fd = None
+            else:
+                self.scanner.settle = 0.0
+        elif use_inotify:
+            logger.info("inotify indisponible, scrutation du dossier")
+
+    @property
+    def mode(self) -> str:
+        return 'inotify' if self._fd is not None else 'polling'
+
+    def initial(self) -> List[str]:
+        """Images présentes au démarrage (les dossiers sont surveillés d'abord
+        pour ne rien manquer entre le parcours et la première attente)"""
+        if self._fd is not None:
+            self._watch_tree(self.root)
+        self._last_poll = time.monotonic()
+        return self._scan([self.root])
+
+    def _scan(self, paths):
+        self.scanner.start(paths)
+        return sorted(self.scanner.wait())
+
+    def _watch_tree(self, top):
+        for dirpath, dirnames, _ in os.walk(top):
+            dirnames[:] = [name for name in dirnames if not name.startswith('.')]
+            self._add_watch(dirpath)
+
+    def _add_watch(self, path):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            logger.warning("Impossible de surveiller %s: %s",
+                           path, os.strerror(ctypes.get_errno()))
+        else:
+            self._watches[wd] = path
+
+    def changes(self, timeout: Optional[float] = None) -> List[str]:
+        """Attend au plus ``timeout`` secondes et retourne les nouvelles images"""
+        if self._fd is None:
+            return self._poll_changes(timeout)
+
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return []
+        files, folders = self._read_events()
+        if self._rescan:
+            # File d'événements débordée : reparcourir tout le dossier
+            self._rescan = False
+            logger.info("File inotify pleine, nouveau parcours de %s", self.root)
+            return self._scan([self.root])
+        for folder in folders:
+            self._watch_tree(folder)
+        return self._scan(folders + files) if files or folders else []
+
+    def _read_events(self):
+        files, folders = [], []
+        while True:
+            try:
+                data = os.read(self._fd, 65536)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    self._rescan = True
+                    continue
+                if mask & IN_IGNORED:
+                    self._watches.pop(wd, None)
+                    continue
+                folder = self._watches.get(wd)
+                if folder is None or not name or name.startswith('.'):
+                    continue
+                path = os.path.join(folder, name)
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        folders.append(path)
+                elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                    files.append(path)
+        return files, folders
+
+    def _poll_changes(self, timeout):
+        delay = self._last_poll + self.interval - time.monotonic()
+        if timeout is not None:
+            delay = min(delay, timeout)
+        if delay > 0:
+            time.sleep(delay)
+        if time.monotonic() < self._last_poll + self.interval:
+            return []
+        self._last_poll = time.monotonic()
+        return self._scan([self.root])
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        self.scanner.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -1,28 +1,52 @@
+import sys
+if __name__ == "__main__" and sys.argv[1:2] in (['render'], ['watch']):
+    # Mode par lots : ni Tk ni l'interface ne sont chargés
+    from cli import main
+    sys.exit(main(sys.argv[1:]))
+
 import tkinter as tk
 from tkinter import ttk
 from styles import Colors, Spacing, Typography
 from pathlib import Path
-import json
-from PIL import Image, ImageTk, ImageDraw, ImageFont, ImageOps, ImageChops, ImageColor # type: ignore
-from typing import List, Optional
-try:
-    from tkinterdnd2 import DND_FILES, TkinterDnD # type: ignore
-except ImportError:
-    print("Pour activer le drag & drop, installez tkinterdnd2 avec:")
-    print("pip install tkinterdnd2")
-    DND_FILES = "DND_FILES"
-    TkinterDnD = tk.Tk
+from typing import List
+import logging
+logger = logging.getLogger(__name__)
 import math
+from collections import OrderedDict
 import os
 import platform
 import subprocess
-import random
-import numpy as np # type: ignore
-import emoji
+from decoding import load_resized
+from encoders import ENCODER_KEYS, available_formats
+from jobs import BackgroundJob, JobCancelled
+from memory import TileCache
+from importer import ImageImporter
+from scanner import FolderScanner
+from renderer import CollageRenderer
+from thumbnail_cache import ThumbnailCache
+from metadata_index import MetadataIndex, probe_image
+
+def enable_drag_and_drop(root):
+    """Charge tkdnd dans ``root`` ; retourne le type de données des fichiers
+    déposés, ou None si tkinterdnd2 n'est pas installé"""
+    try:
+        from tkinterdnd2 import DND_FILES, TkinterDnD # type: ignore
+        TkinterDnD._require(root)
+        return DND_FILES
+    except (ImportError, RuntimeError, tk.TclError):
+        logger.warning("Pour activer le drag & drop, installez tkinterdnd2 avec: pip install tkinterdnd2")
+        return None
+
 
-class ModernApp(TkinterDnD.Tk):
+class ModernApp(tk.Tk):
+    # Au-delà, la prévisualisation passe en qualité « draft »
+    PREVIEW_DRAFT_IMAGES = 300
+    # Mémoire maximale des tuiles gardées entre deux prévisualisations
+    PREVIEW_TILE_BYTES = 256 * 1024 * 1024
+    
     def __init__(self):
         super().__init__()
+        self.dnd_files = enable_drag_and_drop(self)
         
         self.title("Collage")
         self.configure(bg=Colors.SYSTEM_BLACK)
@@ -30,6 +54,11 @@ class ModernApp(TkinterDnD.Tk):
         # Configuration de base
         self.setup_window()
         self.setup_styles()
+        
+        # Index des métadonnées partagé par la grille et le rendu
+        self.metadata_index = self.open_metadata_index()
+        self.thumbnail_cache = self.open_thumbnail_cache()
+        
         self.create_ui()
         
         # État
@@ -180,6 +209,7 @@ class ModernApp(TkinterDnD.Tk):
                     fg=Colors.TEXT).pack(side='left', padx=(0, Spacing.M))
             
             width_var = tk.StringVar(value="2000")
+            self.width_var = width_var
             width_entry = ttk.Entry(dim_frame, textvariable=width_var, width=8)
             width_entry.pack(side='left', padx=Spacing.XS)
             
@@ -190,6 +220,7 @@ class ModernApp(TkinterDnD.Tk):
                     fg=Colors.TEXT).pack(side='left', padx=Spacing.XS)
             
             height_var = tk.StringVar(value="2000")
+            self.height_var = height_var
             height_entry = ttk.Entry(dim_frame, textvariable=height_var, width=8)
             height_entry.pack(side='left', padx=Spacing.XS)
             
@@ -265,6 +296,9 @@ class ModernApp(TkinterDnD.Tk):
                                   command=choose_color)
             color_button.pack(side='left', padx=Spacing.XS)
             
+            # Options d'encodage du fichier enregistré
+            self.create_export_options(preview_window)
+            
             # Boutons d'action en bas
             action_frame = tk.Frame(preview_window, bg=Colors.SURFACE)
             action_frame.pack(side='bottom', fill='x', padx=Spacing.L, pady=Spacing.L)
@@ -305,8 +339,16 @@ class ModernApp(TkinterDnD.Tk):
         """Crée la prévisualisation du collage identique au résultat final"""
         loading = self.show_loading_message("Génération de la prévisualisation...")
         try:
-            preview_frame = tk.Frame(window, bg=Colors.SURFACE)
-            preview_frame.pack(fill='both', expand=True, padx=Spacing.L, pady=Spacing.M)
+            # Réutiliser la zone de prévisualisation existante plutôt que d'en
+            # empiler une nouvelle à chaque changement d'option
+            preview_frame = getattr(self, 'preview_frame', None)
+            if preview_frame is None or preview_frame.master is not window or not preview_frame.winfo_exists():
+                preview_frame = tk.Frame(window, bg=Colors.SURFACE)
+                preview_frame.pack(fill='both', expand=True, padx=Spacing.L, pady=Spacing.M)
+                self.preview_frame = preview_frame
+            else:
+                for child in preview_frame.winfo_children():
+                    child.destroy()
             
             if self.grid_view.images:
                 try:
@@ -320,29 +362,18 @@ class ModernApp(TkinterDnD.Tk):
                     if preview_height <= 0:
                         preview_height = 600
                     
-                    # Créer le collage exactement comme pour le résultat final
-                    collage = self.create_collage_image(self.grid_view.images, preview_width, preview_height)
-                    
-                    if collage is None:
-                        raise Exception("Erreur lors de la création du collage")
-                    
-                    # Appliquer le même post-traitement que pour le résultat final
-                    bg_color = self.background_color.get()
-                    collage = self.post_process_collage(collage, preview_width, preview_height, bg_color)
-                    
-                    # Calculer les dimensions pour l'affichage
-                    collage_ratio = collage.width / collage.height
-                    frame_ratio = preview_width / preview_height
-                    
-                    if collage_ratio > frame_ratio:
-                        new_width = preview_width
-                        new_height = int(preview_width / collage_ratio)
-                    else:
-                        new_height = preview_height
-                        new_width = int(preview_height * collage_ratio)
-                    
-                    # Redimensionner pour l'affichage
-                    preview_collage = collage.resize((new_width, new_height), Image.Resampling.LANCZOS)
+                    # Même disposition que le résultat final, rendue directement
+                    # à la taille de la prévisualisation
+                    renderer, plan = self.get_collage_plan(*self.collage_dimensions(),
+                                                           quality=self.preview_quality())
+                    # Les tuiles déjà redimensionnées sont gardées : un changement
+                    # de couleur ou de mode ne fait que recomposer l'image
+                    preview_collage = renderer.render_plan(
+                        plan, plan.fit_scale(preview_width, preview_height),
+                        background=renderer.background_color,
+                        tile_cache=self.preview_tiles)
+                    bg_color = renderer.background_color
+                    new_width, new_height = preview_collage.size
                     
                     # Créer le canvas et afficher
                     canvas = tk.Canvas(preview_frame, 
@@ -353,6 +384,7 @@ class ModernApp(TkinterDnD.Tk):
                     canvas.pack(fill='both', expand=True)
                     
                     # Créer l'image Tkinter
+                    from PIL import ImageTk # type: ignore
                     photo = ImageTk.PhotoImage(preview_collage)
                     
                     # Centrer l'image
@@ -368,338 +400,222 @@ class ModernApp(TkinterDnD.Tk):
                                          fg=Colors.TEXT,
                                          font=Typography.BODY)
                     error_label.pack(expand=True)
-                    print(f"Erreur détaillée: {e}")
+                    logger.exception("Erreur lors de la prévisualisation: %s", e)
         finally:
             loading.destroy()
     
-    def create_collage_image(self, image_paths, width, height):
-        """Crée l'image du collage"""
-        # Vérifier si on doit afficher les thèmes
-        show_themes = hasattr(self, 'show_themes') and self.show_themes.get()
-        print(f"Show themes option is: {show_themes}")  # Debug print
-        
-        if show_themes:
-            print("Creating grid collage with themes")  # Debug print
-            return self._create_grid_collage(image_paths, width, height)
-        else:
-            print("Creating dense collage without themes")  # Debug print
-            return self._create_dense_collage(image_paths, width, height)
-    
-    def _create_grid_collage(self, image_paths, width, height):
-        """Crée un collage en grille avec espaces pour les thèmes"""
-        # Afficher le message de chargement
-        loading = self.show_loading_message("Création du collage en grille...")
+    def open_metadata_index(self):
+        """Ouvre l'index persistant des métadonnées (None si indisponible)"""
         try:
-            # Calculer la disposition
-            n_images = len(image_paths)
-            if n_images == 0:
-                return Image.new('RGB', (width, height), self.background_color.get())
-                
-            cols = math.ceil(math.sqrt(n_images))
-            rows = math.ceil(n_images / cols)
-            
-            # Calculer la taille des vignettes avec padding
-            padding = 20  # Espace entre les images
-            text_height = 40  # Augmenter l'espace pour le texte pour accommoder les emojis
-            
-            # Calculer les dimensions des cellules
-            available_width = width - (cols + 1) * padding
-            available_height = height - (rows + 1) * padding - rows * text_height
-            
-            if available_width <= 0 or available_height <= 0:
-                # Ajuster les dimensions minimales si nécessaire
-                cell_width = max(100, (width - (cols + 1) * padding) // cols)
-                cell_height = max(100, (height - (rows + 1) * padding - rows * text_height) // rows)
-            else:
-                cell_width = available_width // cols
-                cell_height = available_height // rows
-            
-            # S'assurer que les dimensions sont positives
-            cell_width = max(50, cell_width)
-            cell_height = max(50, cell_height)
-            
-            # Réduire la hauteur de l'image pour laisser de la place au texte
-            thumb_width = cell_width
-            thumb_height = cell_height
-            
-            # Utiliser la couleur de fond sélectionnée
-            bg_color = self.background_color.get() if hasattr(self, 'background_color') else '#FFFFFF'
-            collage = Image.new('RGB', (width, height), bg_color)
-            
-            # Créer un objet ImageDraw pour ajouter le texte
-            draw = ImageDraw.Draw(collage)
-            try:
-                font = ImageFont.truetype("arial.ttf", 20)
-            except:
-                font = ImageFont.load_default()
-            
-            # Placer chaque image
-            for idx, path in enumerate(image_paths):
-                try:
-                    with Image.open(path) as img:
-                        # Convertir en RGB si nécessaire
-                        if img.mode != 'RGB':
-                            img = img.convert('RGB')
-                        
-                        # Calculer la position dans la grille
-                        row = idx // cols
-                        col = idx % cols
-                        cell_x = padding + col * (cell_width + padding)
-                        cell_y = padding + row * (cell_height + padding)
-                        
-                        # Calculer les dimensions pour conserver le ratio
-                        img_ratio = img.width / img.height
-                        thumb_ratio = thumb_width / thumb_height
-                        
-                        if img_ratio > thumb_ratio:
-                            # Image plus large que l'espace
-                            new_width = thumb_width
-                            new_height = int(thumb_width / img_ratio)
-                        else:
-                            # Image plus haute que l'espace
-                            new_height = thumb_height
-                            new_width = int(thumb_height * img_ratio)
-                        
-                        # Redimensionner l'image
-                        img_resized = img.resize((new_width, new_height), 
-                                               Image.Resampling.LANCZOS)
-                        
-                        # Centrer l'image dans son espace
-                        paste_x = cell_x + (thumb_width - new_width) // 2
-                        paste_y = cell_y + (thumb_height - new_height) // 2
-                        
-                        # Coller l'image
-                        collage.paste(img_resized, (paste_x, paste_y))
-                        
-                        # Extraire et ajouter le thème
-                        theme = self.extract_theme_from_metadata(img)
-                        print(f"Theme for image {path}: {theme}")  # Debug print
-                        if theme:
-                            # Position du texte sous l'image
-                            text_y = cell_y + thumb_height + 5
-                            # Calculer la largeur du texte pour le centrer
-                            text_width = draw.textlength(theme, font=font)
-                            text_x = cell_x + (cell_width - text_width) // 2
-                            
-                            # Choisir la couleur du texte selon le fond
-                            text_color = (0, 0, 0) if bg_color.startswith('#FFF') else (255, 255, 255)
-                            
-                            print(f"Drawing theme '{theme}' at position ({text_x}, {text_y})")  # Debug print
-                            # Ajouter le texte
-                            draw.text((text_x, text_y), theme, 
-                                    fill=text_color, font=font)
-                            print(f"Theme text drawn successfully")  # Debug print
-                
-                except Exception as e:
-                    print(f"Erreur lors du traitement de {path}: {e}")
-            
-            return collage
-        finally:
-            loading.destroy()
+            return MetadataIndex()
+        except Exception as e:
+            logger.warning("Index des métadonnées indisponible: %s", e)
+            return None
     
-    def _create_dense_collage(self, image_paths, width, height):
-        """Crée un collage dense avec dimensions optimisées"""
-        loading = self.show_loading_message("Création du collage dense...")
+    def open_thumbnail_cache(self):
+        """Ouvre le cache disque des miniatures (None si indisponible)"""
         try:
-            bg_color = self.background_color.get() if hasattr(self, 'background_color') else '#FFFFFF'
-            
-            # Charger les images
-            images = []
-            total_area = width * height
-            for path in image_paths:
-                try:
-                    with Image.open(path) as img:
-                        if img.mode != 'RGB':
-                            img = img.convert('RGB')
-                        ratio = img.width / img.height
-                        images.append((img.copy(), ratio, path))
-                except Exception as e:
-                    print(f"Erreur lors du chargement de {path}: {e}")
-            
-            if not images:
-                return Image.new('RGB', (width, height), bg_color)
-
-            # Calculer le ratio global cible
-            target_ratio = width / height
-            
-            def optimize_layout(imgs, w, h):
-                """Optimise la disposition des images pour un résultat plus carré"""
-                best_rows = []
-                min_waste = float('inf')
-                
-                # Calculer le nombre idéal de lignes pour un résultat carré
-                n_images = len(imgs)
-                ideal_rows = round(math.sqrt(n_images))  # Nombre de lignes pour un carré parfait
-                
-                # Essayer différentes configurations autour du nombre idéal de lignes
-                for n_rows in range(max(1, ideal_rows - 1), ideal_rows + 2):
-                    target_per_row = n_images / n_rows
-                    rows = []
-                    current_row = []
-                    row_width = 0
-                    row_height = h / n_rows
-                    
-                    for img, ratio, _ in imgs:
-                        img_width = row_height * ratio
-                        
-                        # Vérifier si on doit commencer une nouvelle ligne
-                        if len(current_row) >= math.ceil(target_per_row) or (row_width + img_width > w * 1.1 and current_row):
-                            rows.append(current_row)
-                            current_row = []
-                            row_width = 0
-                        
-                        current_row.append((img, ratio, _))
-                        row_width += img_width
-                    
-                    if current_row:
-                        rows.append(current_row)
-                    
-                    # Calculer le score de cette disposition
-                    waste = 0
-                    for row in rows:
-                        # Pénaliser les lignes trop courtes ou trop longues
-                        row_ratio = sum(r for _, r, _ in row)
-                        ideal_height = w / row_ratio
-                        waste += abs(ideal_height - row_height)
-                        
-                        # Pénaliser les lignes avec trop peu ou trop d'images
-                        waste += abs(len(row) - target_per_row) * 0.5
-                    
-                    # Favoriser les dispositions proches du carré
-                    aspect_ratio = w / (h / len(rows))
-                    waste += abs(aspect_ratio - 1.0) * w  # Pénaliser les ratios non carrés
-                    
-                    if waste < min_waste:
-                        min_waste = waste
-                        best_rows = rows
-                
-                return best_rows
-
-            # Trier les images par ratio similaire
-            images.sort(key=lambda x: x[1], reverse=True)
-            
-            # Trouver la meilleure disposition
-            rows = optimize_layout(images, width, height)
-            
-            # Calculer les dimensions réelles nécessaires
-            real_height = 0
-            max_width = 0
-            
-            for row in rows:
-                row_ratio = sum(ratio for _, ratio, _ in row)
-                row_height = width / row_ratio
-                real_height += row_height
-                row_width = sum(ratio * row_height for _, ratio, _ in row)
-                max_width = max(max_width, row_width)
-            
-            # Ajuster les dimensions du canvas pour correspondre au contenu
-            scale = min(width / max_width, height / real_height)
-            final_width = int(max_width * scale)
-            final_height = int(real_height * scale)
-            
-            # Créer le collage avec les dimensions optimisées
-            collage = Image.new('RGB', (final_width, final_height), bg_color)
-            y = 0
-            
-            for row in rows:
-                row_ratio = sum(ratio for _, ratio, _ in row)
-                row_height = (width / row_ratio) * scale
-                x = 0
-                
-                for img, ratio, _ in row:
-                    img_width = int(row_height * ratio)
-                    img_height = int(row_height)
-                    
-                    img_resized = img.resize((img_width, img_height), Image.Resampling.LANCZOS)
-                    collage.paste(img_resized, (x, int(y)))
-                    x += img_width
-                
-                y += row_height
-            
-            return collage
-            
-        finally:
-            loading.destroy()
+            return ThumbnailCache()
+        except Exception as e:
+            logger.warning("Cache des miniatures indisponible: %s", e)
+            return None
     
-    def post_process_collage(self, collage, width, height, bg_color):
-        """Post-traitement pour éliminer les espaces blancs en préservant strictement les ratios"""
+    def make_renderer(self, quality='final'):
+        """Construit le moteur de rendu à partir des options de l'interface"""
+        show_themes = hasattr(self, 'show_themes') and self.show_themes.get()
+        bg_color = self.background_color.get() if hasattr(self, 'background_color') else '#FFFFFF'
+        return CollageRenderer(background_color=bg_color, show_themes=show_themes,
+                               index=self.metadata_index, quality=quality)
+    
+    def preview_quality(self):
+        """Qualité de la prévisualisation : rapide pour les grands ensembles"""
+        if len(self.grid_view.images) > self.PREVIEW_DRAFT_IMAGES:
+            return 'draft'
+        return 'balanced'
+    
+    def collage_dimensions(self):
+        """Dimensions demandées dans la fenêtre de prévisualisation"""
         try:
-            # Convertir l'image en tableau numpy
-            img_array = np.array(collage)
-            bg_color_array = np.array(ImageColor.getrgb(bg_color))
-            
-            # Calculer la différence pour chaque canal avec une tolérance
-            tolerance = 10  # Tolérance pour la détection du fond
-            diff_r = np.abs(img_array[:,:,0] - bg_color_array[0]) > tolerance
-            diff_g = np.abs(img_array[:,:,1] - bg_color_array[1]) > tolerance
-            diff_b = np.abs(img_array[:,:,2] - bg_color_array[2]) > tolerance
-            
-            # Combiner les différences
-            non_bg_mask = diff_r | diff_g | diff_b
-            
-            # Trouver les limites du contenu réel
-            rows = np.any(non_bg_mask, axis=1)
-            cols = np.any(non_bg_mask, axis=0)
-            
-            if not np.any(rows) or not np.any(cols):
-                return collage
-            
-            # Obtenir les indices des limites
-            rmin, rmax = np.where(rows)[0][[0, -1]]
-            cmin, cmax = np.where(cols)[0][[0, -1]]
-            
-            # Simple recadrage aux limites du contenu
-            cropped = collage.crop((cmin, rmin, cmax + 1, rmax + 1))
-            
-            # Créer l'image finale avec les dimensions du contenu recadré
-            final = Image.new('RGB', (cropped.width, cropped.height), bg_color)
-            final.paste(cropped, (0, 0))
-            
-            return final
-            
-        except Exception as e:
-            print(f"Erreur lors du post-traitement: {e}")
-            return collage
+            return int(self.width_var.get()), int(self.height_var.get())
+        except (AttributeError, ValueError):
+            return 2000, 2000
+    
+    def get_collage_plan(self, width, height, quality='final'):
+        """Retourne le moteur de rendu et la disposition du collage.
+        
+        La disposition est partagée entre la prévisualisation et la
+        sauvegarde. Une disposition est gardée par mode (dense ou grille) :
+        elle n'est recalculée que si les images ou les dimensions demandées
+        changent, ce qui vide aussi les tuiles de la prévisualisation.
+        """
+        renderer = self.make_renderer(quality)
+        if getattr(self, 'collage_plan_key', None) != (list(self.grid_view.images), width, height):
+            self.collage_plan_key = (list(self.grid_view.images), width, height)
+            self.collage_plans = {}
+            self.preview_tiles = TileCache(self.PREVIEW_TILE_BYTES)
+        mode = 'grid' if renderer.show_themes else 'dense'
+        if mode not in self.collage_plans:
+            self.collage_plans[mode] = renderer.plan(self.grid_view.images, width, height)
+        return renderer, self.collage_plans[mode]
+    
+    # Extensions proposées pour chaque format d'enregistrement
+    SAVE_EXTENSIONS = {'JPEG': "*.jpg", 'PNG': "*.png", 'WEBP': "*.webp", 'AVIF': "*.avif"}
+    
+    def create_export_options(self, window):
+        """Réglages d'encodage : JPEG progressif et sous-échantillonnage,
+        compression PNG, effort WebP, vitesse AVIF ('auto' = valeur par défaut)"""
+        export_frame = tk.Frame(window, bg=Colors.SURFACE)
+        export_frame.pack(fill='x', padx=Spacing.L, pady=(0, Spacing.M))
+        
+        tk.Label(export_frame,
+                text="Export:",
+                font=Typography.BODY,
+                bg=Colors.SURFACE,
+                fg=Colors.TEXT).pack(side='left', padx=(0, Spacing.M))
+        
+        self.jpeg_progressive = tk.BooleanVar(value=False)
+        tk.Checkbutton(export_frame,
+                      text="JPEG progressif",
+                      variable=self.jpeg_progressive,
+                      font=Typography.BODY,
+                      bg=Colors.SURFACE,
+                      fg=Colors.TEXT,
+                      selectcolor=Colors.PRIMARY,
+                      activebackground=Colors.SURFACE).pack(side='left', padx=Spacing.XS)
+        
+        self.export_choices = {}
+        choices = [
+            ('subsampling', "Chroma JPEG", ENCODER_KEYS['JPEG']['subsampling']),
+            ('compress_level', "Compression PNG", ENCODER_KEYS['PNG']['compress_level']),
+            ('method', "Effort WebP", ENCODER_KEYS['WEBP']['method']),
+            ('speed', "Vitesse AVIF", ENCODER_KEYS['AVIF']['speed']),
+        ]
+        for key, label, values in choices:
+            tk.Label(export_frame,
+                    text=label,
+                    font=Typography.CAPTION,
+                    bg=Colors.SURFACE,
+                    fg=Colors.TEXT_SECONDARY).pack(side='left', padx=(Spacing.M, Spacing.XS))
+            var = tk.StringVar(value='auto')
+            ttk.Combobox(export_frame, textvariable=var, width=6, state='readonly',
+                         values=['auto'] + [str(v) for v in values]).pack(side='left')
+            self.export_choices[key] = var
+    
+    def export_options(self, format):
+        """Options d'encodage choisies qui concernent ``format``"""
+        options = {}
+        if format == 'JPEG' and self.jpeg_progressive.get():
+            options['progressive'] = True
+        for key, var in self.export_choices.items():
+            value = var.get()
+            if value == 'auto' or key not in ENCODER_KEYS.get(format, {}):
+                continue
+            options[key] = value if key == 'subsampling' else int(value)
+        return options
     
     def save_collage(self, window, width, height):
-        """Sauvegarder le collage"""
+        """Sauvegarder le collage en arrière-plan, avec progression et annulation"""
         from tkinter import filedialog
+        from encoders import format_for_path
+        
+        if getattr(self, 'save_job', None) is not None and not self.save_job.finished:
+            return
         
         output_path = filedialog.asksaveasfilename(
             defaultextension=".jpg",
-            filetypes=[
-                ("JPEG", "*.jpg"),
-                ("PNG", "*.png")
-            ],
+            filetypes=[(format, self.SAVE_EXTENSIONS[format]) for format in available_formats()],
             title="Sauvegarder le collage"
         )
         
         if output_path:
-            loading = self.show_loading_message("Sauvegarde du collage en cours...")
             try:
-                # Créer le collage initial
-                final_collage = self.create_collage_image(self.grid_view.images, width, height)
-                
-                # Post-traitement pour éliminer les espaces blancs
-                bg_color = self.background_color.get() if hasattr(self, 'background_color') else '#FFFFFF'
-                final_collage = self.post_process_collage(final_collage, width, height, bg_color)
-                
-                # Sauvegarder l'image
-                final_collage.save(output_path, quality=95, optimize=True)
-                
-                # Fermer la fenêtre de prévisualisation
-                window.destroy()
-                
-                # Ouvrir l'image avec le visualiseur par défaut
-                if platform.system() == 'Darwin':       # macOS
-                    subprocess.run(['open', output_path])
-                elif platform.system() == 'Windows':    # Windows
-                    os.startfile(output_path)
-                else:                                   # Linux
-                    subprocess.run(['xdg-open', output_path])
-                
-            finally:
-                loading.destroy()
+                format = format_for_path(output_path)
+            except ValueError as e:
+                self.show_error_message("Format non pris en charge", str(e))
+                return
+            options = self.export_options(format)
+            
+            # Rendre la disposition de la prévisualisation en pleine taille
+            renderer, plan = self.get_collage_plan(width, height)
+            plan.background = renderer.background_color
+            
+            def work(job):
+                renderer.progress = job.report
+                renderer.cancel_event = job.cancel_event
+                renderer.render_plan_to_file(plan, output_path, format=format, **options)
+                return output_path
+            
+            self.save_job = BackgroundJob(work, name='save').start()
+            self.show_save_progress(window, self.save_job)
+    
+    def show_save_progress(self, window, job):
+        """Fenêtre de progression de la sauvegarde, interrogée avec after()"""
+        dialog = tk.Toplevel(window)
+        dialog.title("Sauvegarde")
+        dialog.configure(bg=Colors.SURFACE)
+        dialog.resizable(False, False)
+        dialog.transient(window)
+        
+        label = tk.Label(dialog, text="Préparation…",
+                        font=Typography.BODY,
+                        bg=Colors.SURFACE,
+                        fg=Colors.TEXT)
+        label.pack(padx=Spacing.L, pady=(Spacing.L, Spacing.S))
+        bar = ttk.Progressbar(dialog, length=280, maximum=1.0)
+        bar.pack(padx=Spacing.L, pady=Spacing.S)
+        cancel_button = tk.Button(dialog,
+                                 text="Annuler",
+                                 font=Typography.BUTTON,
+                                 fg=Colors.PRIMARY,
+                                 bg=Colors.SURFACE,
+                                 activebackground=Colors.SYSTEM_GRAY6,
+                                 relief='flat',
+                                 padx=Spacing.XL,
+                                 pady=Spacing.S,
+                                 command=job.cancel)
+        cancel_button.pack(pady=(Spacing.S, Spacing.L))
+        dialog.protocol("WM_DELETE_WINDOW", job.cancel)
+        
+        stages = {'composite': "Assemblage des images", 'encode': "Encodage du fichier"}
+        
+        def poll():
+            if not dialog.winfo_exists():
+                # Prévisualisation fermée pendant la sauvegarde
+                job.cancel()
+                return
+            if not job.finished:
+                if job.cancelled:
+                    label.configure(text="Annulation…")
+                    cancel_button.configure(state='disabled')
+                elif job.total_steps:
+                    bar.configure(value=job.done_steps / job.total_steps)
+                    label.configure(text=f"{stages.get(job.stage, 'Sauvegarde')}… "
+                                         f"{job.done_steps}/{job.total_steps}")
+                dialog.after(100, poll)
+                return
+            
+            dialog.destroy()
+            if isinstance(job.error, JobCancelled):
+                return
+            if job.error is not None:
+                logger.error("Erreur lors de la sauvegarde: %s", job.error)
+                self.show_error_message("Erreur lors de la sauvegarde", str(job.error))
+                return
+            
+            # Fermer la fenêtre de prévisualisation
+            window.destroy()
+            self.open_in_viewer(job.result)
+        
+        poll()
+    
+    def open_in_viewer(self, output_path):
+        """Ouvrir l'image avec le visualiseur par défaut"""
+        if platform.system() == 'Darwin':       # macOS
+            subprocess.run(['open', output_path])
+        elif platform.system() == 'Windows':    # Windows
+            os.startfile(output_path)
+        else:                                   # Linux
+            subprocess.run(['xdg-open', output_path])
     
     def show_error_message(self, title, message):
         # Créer une fenêtre de dialogue style iOS
@@ -775,38 +691,6 @@ class ModernApp(TkinterDnD.Tk):
                  pady=Spacing.M,
                  command=dialog.destroy).pack(pady=Spacing.L)
     
-    def extract_theme_from_metadata(self, img):
-        """Extrait le thème depuis les métadonnées de l'image"""
-        try:
-            # Get metadata from the prompt field
-            metadata = img.info.get('prompt', '{}')
-            print(f"Raw metadata: {metadata}")  # Debug print
-            
-            # Parse the metadata JSON
-            metadata_dict = json.loads(metadata)
-            print(f"Parsed metadata: {metadata_dict}")  # Debug print
-            
-            # Look for theme in MegaPromptV3 node (207)
-            for node_id, node_data in metadata_dict.items():
-                if node_data.get('class_type') == 'MegaPromptV3':
-                    theme = node_data.get('inputs', {}).get('theme', '')
-                    if theme:
-                        # Remove emoji and leading/trailing whitespace
-                        theme = ''.join(c for c in theme if not self.is_emoji(c)).strip()
-                        print(f"Found theme: {theme}")  # Debug print
-                        return theme
-            
-            print("No theme found in metadata")  # Debug print
-            return None
-            
-        except Exception as e:
-            print(f"Error extracting theme from {img}: {str(e)}")
-            return None
-
-    def is_emoji(self, character):
-        """Check if a character is an emoji"""
-        return character in emoji.EMOJI_DATA
-    
     def show_loading_message(self, message):
         """Affiche un message de chargement flottant"""
         loading_window = tk.Toplevel(self)
@@ -839,19 +723,17 @@ class ModernApp(TkinterDnD.Tk):
         y = (loading_window.winfo_screenheight() // 2) - (height // 2)
         loading_window.geometry(f'+{x}+{y}')
         
-        # Animation du spinner
-        def animate_spinner():
-            chars = "◴◷◶◵"
-            i = 0
-            while loading_window.winfo_exists():
-                spinner_label.config(text=chars[i])
-                i = (i + 1) % len(chars)
-                loading_window.update()
-                loading_window.after(100)
+        # Animation du spinner, planifiée sur la boucle Tk (Tk n'est pas
+        # utilisable depuis un autre thread)
+        chars = "◴◷◶◵"
+        def animate_spinner(i=0):
+            if not loading_window.winfo_exists():
+                return
+            spinner_label.config(text=chars[i])
+            loading_window.after(100, animate_spinner, (i + 1) % len(chars))
         
-        # Démarrer l'animation dans un thread
-        import threading
-        threading.Thread(target=animate_spinner, daemon=True).start()
+        animate_spinner()
+        loading_window.update_idletasks()
         
         return loading_window
 
@@ -881,6 +763,20 @@ class NavigationBar(ttk.Frame):
                              command=self.add_images)
         add_button.pack(side='left', padx=(0, Spacing.M))
         
+        # Bouton dossier
+        folder_button = tk.Button(buttons_frame,
+                                text="Dossier…",
+                                font=Typography.BUTTON,
+                                fg=Colors.SYSTEM_WHITE,
+                                bg=Colors.SYSTEM_GRAY,
+                                activebackground=Colors.SYSTEM_GRAY2,
+                                activeforeground=Colors.SYSTEM_WHITE,
+                                relief='flat',
+                                width=10,  # Largeur fixe
+                                height=1,  # Hauteur fixe
+                                command=self.add_folder)
+        folder_button.pack(side='left', padx=(0, Spacing.M))
+        
         # Bouton réinitialiser
         reset_button = tk.Button(buttons_frame,
                                text="Réinitialiser",
@@ -910,13 +806,51 @@ class NavigationBar(ttk.Frame):
         )
         if files:
             self.master.grid_view.add_images(files)
+    
+    def add_folder(self):
+        from tkinter import filedialog
+        folder = filedialog.askdirectory(title="Sélectionner un dossier d'images")
+        if folder:
+            self.master.grid_view.add_images([folder])
 
 class ImageGridView(ttk.Frame):
+    """Grille de miniatures virtualisée.
+    
+    Seules les lignes visibles (plus une marge) ont des PhotoImage et des
+    éléments de canvas ; ces éléments sont recyclés pendant le défilement.
+    La mémoire et le coût de redessin ne dépendent pas du nombre d'images.
+    """
+    # Intervalle (ms) et taille des lots pour intégrer les miniatures prêtes
+    POLL_INTERVAL = 30
+    POLL_BATCH = 48
+    
+    # Géométrie des cellules
+    THUMB_MAX = 200
+    CAPTION_HEIGHT = 36
+    CELL_WIDTH = THUMB_MAX + 2 * Spacing.M
+    CELL_HEIGHT = THUMB_MAX + CAPTION_HEIGHT + 2 * Spacing.M
+    # Lignes matérialisées au-dessus et au-dessous de la zone visible
+    OVERSCAN_ROWS = 2
+    # Miniatures PIL gardées en mémoire, les autres sont relues du cache disque
+    THUMB_MEMORY = 512
+    
     def __init__(self, master):
         super().__init__(master, style="Modern.TFrame")
         self.images = []
-        self.thumbnails = []
+        self.items = []                  # (thème, taille de miniature) par image
+        self.thumbnails = OrderedDict()  # index -> miniature PIL (LRU)
+        self.slots = {}                  # index -> (image, texte, PhotoImage) affichés
+        self.free_slots = []             # éléments de canvas à recycler
+        self.columns = 1
+        self.x_offset = 0
+        self.importer = None
+        self.loader = None
+        self.scanner = None
+        self.known_files = {}            # chemin -> (mtime_ns, taille) déjà importés
+        self._poll_job = None
+        self._refresh_job = None
         self.setup_grid()
+        self.setup_import_progress()
         self.setup_drop_zone()
     
     def setup_grid(self):
@@ -931,24 +865,13 @@ class ImageGridView(ttk.Frame):
                                      style="TScrollbar",
                                      command=self.canvas.yview)
         
-        # Conteneur pour la grille d'images
-        self.grid_container = ttk.Frame(self.canvas, style="Modern.TFrame")
-        
-        # Configurer le canvas
-        self.canvas.configure(yscrollcommand=self.scrollbar.set)
+        # Configurer le canvas : chaque défilement rafraîchit les cellules visibles
+        self.canvas.configure(yscrollcommand=self.on_scroll)
         
         # Placer les widgets
         self.canvas.pack(side="left", fill="both", expand=True)
         self.scrollbar.pack(side="right", fill="y")
         
-        # Créer la fenêtre du canvas
-        self.canvas_frame = self.canvas.create_window(
-            (0, 0),
-            window=self.grid_container,
-            anchor="nw",
-            width=self.canvas.winfo_width()
-        )
-        
         # Zone de drop avec message
         self.drop_label = ttk.Label(self,
             text="Glissez vos images ici ou cliquez sur ＋",
@@ -956,28 +879,135 @@ class ImageGridView(ttk.Frame):
         self.drop_label.place(relx=0.5, rely=0.5, anchor='center')
         
         # Configurer les événements
-        self.grid_container.bind("<Configure>", self.on_frame_configure)
         self.canvas.bind("<Configure>", self.on_canvas_configure)
         
         # Configurer le scroll avec la molette de la souris
         self.canvas.bind_all("<MouseWheel>", self.on_mousewheel)
     
-    def on_frame_configure(self, event=None):
+    def update_scroll_region(self):
         """Mettre à jour la zone de défilement"""
-        self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+        rows = math.ceil(len(self.items) / self.columns)
+        self.canvas.configure(scrollregion=(0, 0, self.canvas.winfo_width(),
+                                            rows * self.CELL_HEIGHT))
     
     def on_canvas_configure(self, event):
-        """Ajuster la largeur du frame intérieur au canvas"""
-        self.canvas.itemconfig(self.canvas_frame, width=event.width)
+        """Adapter le nombre de colonnes à la largeur du canvas"""
+        columns = max(1, event.width // self.CELL_WIDTH)
+        x_offset = (event.width - columns * self.CELL_WIDTH) // 2
+        if columns != self.columns or x_offset != self.x_offset:
+            self.columns = columns
+            self.x_offset = x_offset
+            # Toutes les cellules changent de place
+            for index in list(self.slots):
+                self.release_slot(index)
+        self.update_scroll_region()
+        self.schedule_refresh()
+    
+    def on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self.schedule_refresh()
     
     def on_mousewheel(self, event):
         """Gérer le défilement avec la molette de la souris"""
         if self.images:  # Scroll seulement s'il y a des images
             self.canvas.yview_scroll(int(-1*(event.delta/120)), "units")
     
+    def schedule_refresh(self):
+        """Regrouper les rafraîchissements demandés pendant un même cycle"""
+        if self._refresh_job is None:
+            self._refresh_job = self.after_idle(self.refresh_visible)
+    
+    def visible_range(self):
+        """Indices des images dans la zone visible, marge comprise"""
+        top = self.canvas.canvasy(0)
+        bottom = top + self.canvas.winfo_height()
+        first_row = max(0, int(top // self.CELL_HEIGHT) - self.OVERSCAN_ROWS)
+        last_row = int(bottom // self.CELL_HEIGHT) + self.OVERSCAN_ROWS
+        return range(first_row * self.columns,
+                     min(len(self.items), (last_row + 1) * self.columns))
+    
+    def refresh_visible(self):
+        """Matérialiser les cellules visibles et recycler les autres"""
+        self._refresh_job = None
+        visible = self.visible_range()
+        
+        for index in list(self.slots):
+            if index not in visible:
+                self.release_slot(index)
+        
+        missing = []
+        for index in visible:
+            if index in self.slots:
+                continue
+            thumb = self.thumbnails.get(index)
+            if thumb is None:
+                missing.append(index)
+            else:
+                self.thumbnails.move_to_end(index)
+                self.show_slot(index, thumb)
+        
+        # Relire en arrière-plan les miniatures sorties de la mémoire ; les
+        # demandes devenues invisibles sont abandonnées
+        if self.loader is not None:
+            self.loader.cancel()
+        if missing:
+            if self.loader is None:
+                self.loader = ImageImporter(self.make_thumbnail_worker(load_info=False))
+            self.loader.submit((self.images[index], index, self.items[index][1])
+                               for index in missing)
+            self.start_polling()
+    
+    def cell_origin(self, index):
+        row, col = divmod(index, self.columns)
+        return self.x_offset + col * self.CELL_WIDTH, row * self.CELL_HEIGHT
+    
+    def show_slot(self, index, thumb):
+        """Afficher la miniature ``index`` dans un élément de canvas recyclé"""
+        theme, _ = self.items[index]
+        x, y = self.cell_origin(index)
+        image_x = x + self.CELL_WIDTH // 2
+        image_y = y + Spacing.M + self.THUMB_MAX // 2
+        text_y = y + Spacing.M + self.THUMB_MAX + Spacing.XS
+        from PIL import ImageTk # type: ignore
+        photo = ImageTk.PhotoImage(thumb)
+        
+        if self.free_slots:
+            image_item, text_item = self.free_slots.pop()
+            self.canvas.coords(image_item, image_x, image_y)
+            self.canvas.itemconfigure(image_item, image=photo, state='normal')
+            self.canvas.coords(text_item, image_x, text_y)
+            self.canvas.itemconfigure(text_item, text=theme or '', state='normal')
+        else:
+            image_item = self.canvas.create_image(image_x, image_y, image=photo,
+                                                  anchor='center')
+            text_item = self.canvas.create_text(image_x, text_y,
+                                                text=theme or '',
+                                                anchor='n',
+                                                justify='center',
+                                                width=self.CELL_WIDTH - 2 * Spacing.S,
+                                                font=Typography.CAPTION,
+                                                fill=Colors.TEXT_SECONDARY)
+        self.slots[index] = (image_item, text_item, photo)
+    
+    def release_slot(self, index):
+        """Cacher une cellule et rendre ses éléments de canvas réutilisables"""
+        image_item, text_item, _ = self.slots.pop(index)
+        self.canvas.itemconfigure(image_item, image='', state='hidden')
+        self.canvas.itemconfigure(text_item, state='hidden')
+        self.free_slots.append((image_item, text_item))
+    
+    def remember_thumbnail(self, index, thumb):
+        self.thumbnails[index] = thumb
+        self.thumbnails.move_to_end(index)
+        while len(self.thumbnails) > self.THUMB_MEMORY:
+            self.thumbnails.popitem(last=False)
+    
     def setup_drop_zone(self):
         # Configurer le drag & drop
-        self.drop_target_register(DND_FILES)
+        dnd_files = self.winfo_toplevel().dnd_files
+        if dnd_files is None:
+            return
+        self.drop_target_register(dnd_files)
         self.dnd_bind('<<Drop>>', self.handle_drop)
         
         # Configurer les événements de survol
@@ -1005,99 +1035,198 @@ class ImageGridView(ttk.Frame):
             foreground=Colors.TEXT_SECONDARY)
     
     def add_images(self, file_paths):
-        """Ajouter des images à la grille en préservant strictement les ratios"""
-        # Afficher le message de chargement
+        """Ajouter des images (ou des dossiers) à la grille.
+        
+        Les dossiers sont parcourus récursivement en arrière-plan et les
+        images y sont reconnues à leur signature, pas à leur extension. Les
+        chemins trouvés passent à l'import au fur et à mesure ; les
+        métadonnées et miniatures sont préparées sans bloquer la fenêtre.
+        Les fichiers déjà importés et inchangés sont ignorés.
+        """
+        if not file_paths:
+            return
+        
+        if self.scanner is None:
+            self.scanner = FolderScanner(known=self.known_files)
+        if self.importer is None:
+            self.importer = ImageImporter(self.make_thumbnail_worker(load_info=True))
+        
+        self.scanner.start(file_paths)
+        self.show_import_progress()
+        self.start_polling()
+    
+    @staticmethod
+    def thumbnail_size(ratio):
+        """Dimensions de la miniature en préservant strictement le ratio"""
+        target_area = 150 * 150  # Surface cible
+        if ratio > 1:  # Image paysage
+            thumb_width = min(200, int(math.sqrt(target_area * ratio)))
+            thumb_height = int(thumb_width / ratio)
+        else:  # Image portrait
+            thumb_height = min(200, int(math.sqrt(target_area / ratio)))
+            thumb_width = int(thumb_height * ratio)
+        return thumb_width, thumb_height
+    
+    def make_thumbnail_worker(self, load_info):
+        """Fonction exécutée dans les workers : métadonnées et miniature PIL.
+        
+        L'index et le cache sont résolus ici, sur le thread principal : les
+        workers ne touchent jamais à Tk.
+        """
         app = self.winfo_toplevel()
-        loading = app.show_loading_message("Chargement des images en cours...")
+        index = getattr(app, 'metadata_index', None)
+        cache = getattr(app, 'thumbnail_cache', None)
         
-        try:
-            valid_extensions = {'.jpg', '.jpeg', '.png', '.gif'}
+        def load_thumbnail(path, size):
+            if cache is None:
+                return load_resized(path, size)
+            return cache.get_or_create(path, size, lambda: load_resized(path, size))
+        
+        def import_image(path):
+            info = index.lookup(path) if index is not None else probe_image(path)
+            if info is None:
+                return None
+            return info, load_thumbnail(path, self.thumbnail_size(info.ratio))
+        
+        def reload_image(task):
+            path, _, size = task
+            return load_thumbnail(path, size)
+        
+        return import_image if load_info else reload_image
+    
+    def start_polling(self):
+        if self._poll_job is None:
+            self._poll_job = self.after(self.POLL_INTERVAL, self.poll_import)
+    
+    def poll_import(self):
+        """Récupère les miniatures prêtes et les intègre à la grille par lots"""
+        self._poll_job = None
+        
+        added = False
+        if self.scanner is not None:
+            # Les chemins découverts partent à l'import sans attendre la fin du parcours
+            found = self.scanner.poll()
+            if found:
+                self.importer.submit(found)
+        
+        if self.importer is not None:
+            for path, result, error in self.importer.poll(self.POLL_BATCH):
+                if error is not None:
+                    logger.warning("Erreur lors du chargement de %s: %s", path, error)
+                elif result is not None:
+                    info, img_thumb = result
+                    self.add_thumbnail(path, info, img_thumb)
+                    added = True
             
-            for path in file_paths:
-                file_path = Path(path)
-                if file_path.suffix.lower() in valid_extensions:
-                    try:
-                        with Image.open(path) as img:
-                            # Extraire le thème
-                            theme = self.master.master.extract_theme_from_metadata(img)
-                            
-                            # Créer un conteneur principal avec padding fixe
-                            container = ttk.Frame(self.grid_container, style="Modern.TFrame")
-                            
-                            # Calculer les dimensions en préservant strictement le ratio
-                            target_area = 150 * 150  # Surface cible
-                            ratio = img.width / img.height
-                            
-                            # Calculer les dimensions pour maintenir le ratio exact
-                            if ratio > 1:  # Image paysage
-                                thumb_width = min(200, int(math.sqrt(target_area * ratio)))
-                                thumb_height = int(thumb_width / ratio)
-                            else:  # Image portrait
-                                thumb_height = min(200, int(math.sqrt(target_area / ratio)))
-                                thumb_width = int(thumb_height * ratio)
-                            
-                            # Créer la miniature
-                            img_thumb = img.resize((thumb_width, thumb_height), Image.Resampling.LANCZOS)
-                            photo = ImageTk.PhotoImage(img_thumb)
-                            
-                            # Image dans un cadre pour centrage
-                            img_frame = ttk.Frame(container, style="Modern.TFrame")
-                            img_frame.pack(expand=True, fill='both')
-                            
-                            label = ttk.Label(img_frame, image=photo, style="Modern.TLabel")
-                            label.image = photo  # Garder une référence
-                            label.pack(expand=True, padx=Spacing.XS, pady=Spacing.XS)
-                            
-                            # Thème
-                            if theme:
-                                theme_label = ttk.Label(container, 
-                                                      text=theme,
-                                                      style="Caption.TLabel",
-                                                      wraplength=max(thumb_width, 100))
-                                theme_label.pack(pady=(0, Spacing.XS))
-                            
-                            # Ajouter à la grille avec espacement uniforme
-                            row = len(self.images) // 4
-                            col = len(self.images) % 4
-                            container.grid(row=row, column=col, 
-                                         padx=Spacing.M, pady=Spacing.M,
-                                         sticky='nsew')
-                            
-                            # Configurer l'expansion de la grille
-                            self.grid_container.grid_columnconfigure(col, weight=1)
-                            self.grid_container.grid_rowconfigure(row, weight=1)
-                            
-                            self.images.append(path)
-                            self.thumbnails.append(photo)
-                            
-                            # Cacher le message si des images sont présentes
-                            if self.images:
-                                self.drop_label.place_forget()
-                            
-                            # Mettre à jour la zone de défilement
-                            self.on_frame_configure()
-                
-                    except Exception as e:
-                        print(f"Erreur lors du chargement de {path}: {e}")
+            if self.scanning or self.importer.active:
+                self.update_import_label()
+            else:
+                self.hide_import_progress()
         
-        finally:
-            loading.destroy()
+        if self.loader is not None:
+            for (_, index, _), thumb, error in self.loader.poll(self.POLL_BATCH):
+                if thumb is None or index >= len(self.items):
+                    continue
+                self.remember_thumbnail(index, thumb)
+                if index not in self.slots and index in self.visible_range():
+                    self.show_slot(index, thumb)
+        
+        if added:
+            # Une seule mise à jour de la zone de défilement par lot
+            self.update_scroll_region()
+            self.schedule_refresh()
+        
+        if (self.scanning
+                or (self.importer is not None and self.importer.active)
+                or (self.loader is not None and self.loader.active)):
+            self.start_polling()
+    
+    def add_thumbnail(self, path, info, img_thumb):
+        """Ajoute une image à la grille (thread principal uniquement)"""
+        index = len(self.items)
+        self.items.append((info.theme, img_thumb.size))
+        self.images.append(path)
+        self.remember_thumbnail(index, img_thumb)
+        
+        # Cacher le message si des images sont présentes
+        self.drop_label.place_forget()
+    
+    def setup_import_progress(self):
+        """Barre de progression de l'import, cachée au repos"""
+        self.import_bar = tk.Frame(self, bg=Colors.SURFACE,
+                                   padx=Spacing.M, pady=Spacing.S)
+        self.import_label = ttk.Label(self.import_bar, text="",
+                                      style="Caption.TLabel",
+                                      background=Colors.SURFACE)
+        self.import_label.pack(side='left')
+        tk.Button(self.import_bar,
+                 text="Annuler",
+                 font=Typography.CAPTION,
+                 fg=Colors.PRIMARY,
+                 bg=Colors.SURFACE,
+                 activebackground=Colors.SYSTEM_GRAY6,
+                 relief='flat',
+                 command=self.cancel_import).pack(side='right')
+    
+    @property
+    def scanning(self):
+        return self.scanner is not None and self.scanner.active
+    
+    def update_import_label(self):
+        text = f"Chargement des images… {self.importer.done}/{self.importer.total}"
+        if self.scanning:
+            text = f"Recherche des images… {self.scanner.found} trouvées · " + text
+        self.import_label.configure(text=text)
+    
+    def show_import_progress(self):
+        self.update_import_label()
+        self.import_bar.place(relx=0.5, rely=1.0, anchor='s', relwidth=1.0)
+    
+    def hide_import_progress(self):
+        self.import_bar.place_forget()
+    
+    def cancel_import(self):
+        """Abandonner les images pas encore chargées"""
+        if self.scanner is not None:
+            self.scanner.cancel()
+        if self.importer is not None:
+            abandoned = self.importer.cancel()
+            if self.scanner is not None:
+                self.scanner.forget(abandoned)
+        self.hide_import_progress()
+    
+    def destroy(self):
+        # Ne pas attendre la fin des miniatures en attente à la fermeture
+        for worker in (self.scanner, self.importer, self.loader):
+            if worker is not None:
+                worker.shutdown()
+        super().destroy()
     
     def reset(self):
         """Réinitialiser la grille d'images"""
+        # Arrêter l'import en cours
+        self.cancel_import()
+        
+        if self.loader is not None:
+            self.loader.cancel()
+        
         # Nettoyer la grille
-        for widget in self.grid_container.winfo_children():
-            widget.destroy()
+        self.canvas.delete('all')
+        self.slots.clear()
+        self.free_slots.clear()
         
         # Réinitialiser les listes
         self.images.clear()
+        self.items.clear()
         self.thumbnails.clear()
+        self.known_files.clear()
         
         # Réafficher le message de drop
         self.drop_label.place(relx=0.5, rely=0.5, anchor='center')
         
         # Mettre à jour la zone de défilement
-        self.on_frame_configure()
+        self.update_scroll_region()
+        self.canvas.yview_moveto(0)
 
 class ActionSheet(tk.Frame):
     def __init__(self, master):
@@ -1121,5 +1250,9 @@ class ActionSheet(tk.Frame):
         pass
 
 if __name__ == "__main__":
+    from cli import setup_logging
+    from tracing import enable_from_env
+    setup_logging()
+    enable_from_env()
     app = ModernApp()
     app.mainloop() 
\ No newline at end of file